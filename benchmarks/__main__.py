@@ -0,0 +1,153 @@
+# benchmarks/__main__.py
+"""
+Offline benchmarks: saved Booli/Svenskfast pages served from disk, no
+network. Run from the repository root:
+
+    python -m benchmarks                  # run, compare with baseline.json
+    python -m benchmarks --save-baseline  # record this machine's baseline
+    python -m benchmarks -k storage       # only stages matching "storage"
+    python -m benchmarks --check          # exit 1 on any regression
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from real_estate.config import HTML_PARSER
+
+from .stages import STAGES, Stage
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+
+def _time_per_call(fn: Callable[[], object], rounds: int, min_round: float) -> List[float]:
+    """
+    Seconds per call for each of `rounds` rounds. A round repeats `fn`
+    until it has run for at least `min_round` seconds.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round:
+            break
+        number *= 2 if elapsed * 2 >= min_round else 10
+
+    results = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        results.append((time.perf_counter() - start) / number)
+    return results
+
+
+def _peak_bytes(fn: Callable[[], object]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_stage(stage: Stage, scale: int, rounds: int, min_round: float) -> Dict[str, float]:
+    fn = stage.setup(scale)
+    try:
+        fn()  # warm-up: imports, regex/xpath compilation, caches
+        times = _time_per_call(fn, rounds, min_round)
+        peak = _peak_bytes(fn)
+    finally:
+        stage.teardown()
+    return {
+        "best_ms": round(min(times) * 1000, 4),
+        "median_ms": round(statistics.median(times) * 1000, 4),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _load_baseline(path: Path) -> Dict[str, Dict[str, float]]:
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f).get("stages", {})
+
+
+def _save_baseline(path: Path, results: Dict[str, Dict[str, float]], scale: int) -> None:
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "html_parser": HTML_PARSER,
+        "scale": scale,
+        "stages": results,
+    }
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("-k", dest="pattern", default="", help="only stages containing this")
+    parser.add_argument("--scale", type=int, default=1, help="multiply synthetic dataset sizes")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-round", type=float, default=0.2, help="seconds per timing round")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25,
+        help="slowdown (fraction of the baseline) reported as a regression",
+    )
+    parser.add_argument("--check", action="store_true", help="exit 1 if anything regressed")
+    args = parser.parse_args(argv)
+
+    baseline = _load_baseline(args.baseline)
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+
+    print(f"HTML parser: {HTML_PARSER}, scale {args.scale}, Python {platform.python_version()}")
+    print(f"{'stage':<42} {'best ms':>10} {'median ms':>10} {'peak KiB':>10}  vs baseline")
+    for stage in STAGES:
+        if args.pattern not in stage.name:
+            continue
+        r = run_stage(stage, args.scale, args.rounds, args.min_round)
+        results[stage.name] = r
+
+        base = baseline.get(stage.name)
+        change = ""
+        if base:
+            ratio = r["best_ms"] / base["best_ms"] - 1
+            change = f"{ratio:+.1%}"
+            if ratio > args.threshold:
+                change += "  REGRESSION"
+                regressions.append(stage.name)
+            elif ratio < -args.threshold:
+                change += "  faster"
+        print(
+            f"{stage.name:<42} {r['best_ms']:>10.3f} {r['median_ms']:>10.3f} "
+            f"{r['peak_kib']:>10.1f}  {change}",
+            flush=True,
+        )
+
+    if args.save_baseline:
+        # keep stages that weren't run this time (-k)
+        _save_baseline(args.baseline, {**baseline, **results}, args.scale)
+        print(f"\nBaseline written to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} stage(s) slower than baseline by more than {args.threshold:.0%}")
+
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+# benchmarks/booli_standin.py
+"""
+Local stand-in for booli.se + svenskfast.se: synthetic search result
+pages (the object-card markup scraper_list.py expects), detail pages and
+broker pages, with optional latency and error injection.
+
+    python -m benchmarks.booli_standin --listings 10000 --latency-ms 20
+
+Search:  /sok/till-salu?page=N   (per_page cards per page, then empty)
+Detail:  /annons/<booli_id>      (links to the broker page below)
+Broker:  /svenskfast.se/objekt/<booli_id>/  (linked via `broker_host`, so
+         the client sees it as a separate host, like svenskfast.se)
+"""
+
+import argparse
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from real_estate.config import MAX_MONTHLY_FEE_SEK, MAX_PRICE_SEK, MIN_LIVING_AREA_M2
+
+from .fixtures import read
+
+FIRST_ID = 1_000_000
+
+AREAS = (
+    "Aspudden", "Hägersten", "Midsommarkransen", "Liljeholmen", "Årsta",
+    "Hammarbyhöjden", "Södermalm", "Vasastan", "Kungsholmen", "Gröndal",
+)
+STREETS = (
+    "Hägerstensvägen", "Sjövikshöjden", "Tellusborgsvägen", "Årstavägen", "Ringvägen",
+    "Hornsgatan", "Sankt Eriksgatan", "Fleminggatan", "Valhallavägen", "Lövholmsvägen",
+)
+
+_BROKER_LINK_RE = re.compile(r'href="https://www\.svenskfast\.se/[^"]*"')
+
+
+@dataclass
+class StandinConfig:
+    listings: int = 10_000
+    per_page: int = 35
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # share of detail/broker responses answered with a 503
+    error_rate: float = 0.0
+    # same for search pages after the first (page 1 failing ends the run)
+    search_error_rate: float = 0.0
+    # share of listings generated inside the "default" filter profile
+    match_rate: float = 1.0
+    seed: int = 1
+    # name the broker pages are linked under (same server, other host)
+    broker_host: str = "localhost"
+    # extra delay on broker pages only: a degraded svenskfast.se
+    broker_latency_ms: float = 0.0
+
+
+def _sek(n: int) -> str:
+    return f"{n:,}".replace(",", " ")
+
+
+def card(booli_id: int, config: StandinConfig) -> str:
+    """
+    One search result card; the same booli_id always gives the same card.
+    """
+    rng = random.Random(config.seed * 1_000_003 + booli_id)
+    if rng.random() < config.match_rate:
+        price = rng.randrange(900_000, MAX_PRICE_SEK, 5000)
+        m2 = rng.uniform(MIN_LIVING_AREA_M2, MIN_LIVING_AREA_M2 + 40)
+        fee = rng.randrange(900, MAX_MONTHLY_FEE_SEK, 7)
+    else:
+        price = rng.randrange(MAX_PRICE_SEK + 5000, 2 * MAX_PRICE_SEK, 5000)
+        m2 = rng.uniform(MIN_LIVING_AREA_M2, MIN_LIVING_AREA_M2 + 60)
+        fee = rng.randrange(900, 2 * MAX_MONTHLY_FEE_SEK, 7)
+    status = rng.choice(
+        (f"{rng.randint(1, 60)} dagar på Booli", "Inkommet idag", "Inkommet igår", "Snart till salu")
+    )
+    tags = "".join(
+        f'<span class="tag">{t}</span>' for t in ("Hiss", "Balkong", "Uteplats") if rng.random() < 0.5
+    )
+    address = f"{rng.choice(STREETS)} {rng.randint(1, 120)}"
+    m2_text = f"{m2:.1f}".replace(".", ",")
+    return (
+        f'<li class="search-page__module-container"><article class="object-card">'
+        f'<a class="object-card__image-link" href="/annons/{booli_id}" tabindex="-1">'
+        f'<div class="object-card-layout"><div class="object-card-layout__image">'
+        f'<img alt="Bild på {address}" loading="lazy" src="https://bcdn.se/images/cache/{booli_id}_1_540x420.jpg">'
+        f"</div></div></a>"
+        f'<div class="object-card-layout__content">'
+        f'<span class="object-card__preamble">Lägenhet · {rng.choice(AREAS)} · Stockholm</span>'
+        f'<h3 class="object-card__title"><a href="/annons/{booli_id}">{address}</a></h3>'
+        f'<div class="object-card__price-container"><span class="object-card__price">{_sek(price)} kr</span></div>'
+        f'<ul class="object-card__data-list"><li>{m2_text} m²</li>'
+        f"<li>{rng.choice(('1', '1,5', '2', '3'))} rum</li>"
+        f"<li>vån {rng.randint(0, 6)}</li><li>{_sek(fee)} kr/mån</li></ul>"
+        f'<div class="object-card__tags">{tags}<span class="object-card__status">{status}</span></div>'
+        f"</div></article></li>"
+    )
+
+
+def search_page(page: int, config: StandinConfig) -> str:
+    first = (page - 1) * config.per_page
+    ids = range(FIRST_ID + first, FIRST_ID + min(first + config.per_page, config.listings))
+    cards = "".join(card(i, config) for i in ids)
+    return (
+        '<!DOCTYPE html><html lang="sv"><head><meta charset="utf-8">'
+        "<title>Bostadsrätter till salu - Booli</title></head><body><main>"
+        f'<h1>{config.listings} bostadsrätter</h1><ul class="search-page__list">{cards}</ul>'
+        f'<nav class="pagination"><a href="?page={page + 1}">Nästa</a></nav>'
+        "</main></body></html>"
+    )
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the enrichment pool opens many connections at once
+    request_queue_size = 128
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    config: StandinConfig  # set by make_standin
+    detail_template: str
+    broker_page: bytes
+
+    def do_GET(self) -> None:
+        config = self.config
+        url = urlsplit(self.path)
+        if config.latency_ms or config.jitter_ms:
+            time.sleep((config.latency_ms + random.uniform(0, config.jitter_ms)) / 1000)
+
+        if url.path.startswith("/sok/"):
+            page = int(dict(parse_qsl(url.query)).get("page", 1))
+            if page > 1 and random.random() < config.search_error_rate:
+                return self._send(503, b"busy")
+            return self._send(200, search_page(page, config).encode("utf-8"))
+
+        if random.random() < config.error_rate:
+            return self._send(503, b"busy")
+        if url.path.startswith("/annons/"):
+            booli_id = url.path.rsplit("/", 1)[1]
+            host = f"{config.broker_host}:{self.server.server_address[1]}"
+            body = self.detail_template.replace(
+                "{BROKER_URL}", f"http://{host}/svenskfast.se/objekt/{booli_id}/"
+            )
+            return self._send(200, body.encode("utf-8"))
+        if url.path.startswith("/svenskfast.se/"):
+            if config.broker_latency_ms:
+                time.sleep(config.broker_latency_ms / 1000)
+            return self._send(200, self.broker_page)
+        self._send(404, b"not found")
+
+    def _send(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def make_standin(
+    config: StandinConfig,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> StandinServer:
+    detail = _BROKER_LINK_RE.sub('href="{BROKER_URL}"', read("booli_detail.html"))
+    handler = type(
+        "BoundStandinHandler",
+        (StandinHandler,),
+        {
+            "config": config,
+            "detail_template": detail,
+            "broker_page": read("svenskfast_broker.html").encode("utf-8"),
+        },
+    )
+    return StandinServer((host, port), handler)
+
+
+def serve_in_background(server: StandinServer) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, name="standin", daemon=True)
+    thread.start()
+    return thread
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = StandinConfig()
+    parser.add_argument("--listings", type=int, default=defaults.listings)
+    parser.add_argument("--per-page", type=int, default=defaults.per_page)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--search-error-rate", type=float, default=defaults.search_error_rate)
+    parser.add_argument("--match-rate", type=float, default=defaults.match_rate)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--broker-host", default=defaults.broker_host)
+    parser.add_argument("--broker-latency-ms", type=float, default=defaults.broker_latency_ms)
+
+
+def config_from_args(args: argparse.Namespace) -> StandinConfig:
+    return StandinConfig(
+        listings=args.listings,
+        per_page=args.per_page,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        search_error_rate=args.search_error_rate,
+        match_rate=args.match_rate,
+        seed=args.seed,
+        broker_host=args.broker_host,
+        broker_latency_ms=args.broker_latency_ms,
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.booli_standin")
+    parser.add_argument("--port", type=int, default=8800)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    server = make_standin(config_from_args(args), port=args.port)
+    print(f"Booli stand-in on http://127.0.0.1:{server.server_address[1]}/sok/till-salu")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
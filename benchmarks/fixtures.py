@@ -0,0 +1,188 @@
+# benchmarks/fixtures.py
+
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List
+from urllib.parse import parse_qsl, urlsplit
+
+from real_estate.html_parser import LIST_CARDS, make_soup
+from real_estate.models import ListingDetail, ListingSummary, Viewing
+from real_estate.scraper_list import parse_cards
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+SEARCH_URL = "https://www.booli.se/sok/till-salu?areaIds=1&objectType=L%C3%A4genhet"
+DETAIL_URL = "https://www.booli.se/annons/5512345"
+BROKER_URL = (
+    "https://www.svenskfast.se/bostadsratt/stockholm/stockholm/hagersten/"
+    "hagerstensvagen-112/3ESM4Q9A2F1/"
+)
+
+_CARD_RE = re.compile(r'<li class="search-page__module-container">.*?</article></li>', re.S)
+_ID_RE = re.compile(r"(?<=/annons/)\d+|(?<=/cache/)\d+")
+
+
+def read(name: str) -> str:
+    return (FIXTURES_DIR / name).read_text(encoding="utf-8")
+
+
+def scaled_search_page(cards: int) -> str:
+    """
+    The saved search page with its cards repeated until there are `cards`
+    of them, each with its own booli_id.
+    """
+    page = read("booli_search.html")
+    originals = _CARD_RE.findall(page)
+    copies = []
+    for i in range(cards):
+        card = originals[i % len(originals)]
+        copies.append(_ID_RE.sub(str(6_000_000 + i), card))
+    start = page.index(originals[0])
+    end = page.index(originals[-1]) + len(originals[-1])
+    return page[:start] + "".join(copies) + page[end:]
+
+
+class FixtureFetcher:
+    """
+    Stand-in for the network (see http_client.set_fetch_stub): Booli
+    search, detail and Svenskfast URLs are answered with saved pages.
+    Search pages after `pages` come back empty, which ends a crawl.
+    """
+
+    def __init__(self, search_page: str, pages: int = 1):
+        self.pages: Dict[str, str] = {
+            "search": search_page,
+            "empty": read("booli_search.html").replace("object-card-layout__content", "x"),
+            "detail": read("booli_detail.html"),
+            "broker": read("svenskfast_broker.html"),
+            "ics": read("viewing.ics"),
+        }
+        self.last_page = pages
+        self.calls = 0
+
+    def __call__(self, url: str) -> str:
+        self.calls += 1
+        parts = urlsplit(url)
+        if "svenskfast.se" in parts.netloc:
+            return self.pages["broker"]
+        if parts.path.endswith(".ics"):
+            return self.pages["ics"]
+        if parts.path.startswith("/annons/"):
+            return self.pages["detail"]
+        page = int(dict(parse_qsl(parts.query)).get("page", 1))
+        return self.pages["search" if page <= self.last_page else "empty"]
+
+
+def synthetic_calendar(events: int) -> str:
+    """
+    A broker calendar export with `events` viewings, built from the saved
+    viewing.ics (distinct UIDs/dates, long DESCRIPTIONs folded at 75).
+    """
+    text = read("viewing.ics")
+    head, rest = text.split("BEGIN:VEVENT", 1)
+    body, tail = rest.split("END:VEVENT", 1)
+    description = "DESCRIPTION:" + "Öppen visning\\, föranmäl dig gärna. " * 6
+    folded = "\r\n ".join(description[i:i + 74] for i in range(0, len(description), 74))
+    out = [head]
+    for i in range(events):
+        day = f"202512{1 + i % 28:02d}"
+        event = (
+            body.replace("visning-5512345-1", f"visning-{5_500_000 + i}-1")
+            .replace("20251207", day)
+            .replace("DESCRIPTION:", folded + "\r\nX-ORIGINAL-DESCRIPTION:")
+        )
+        out.append("BEGIN:VEVENT" + event + "END:VEVENT\r\n")
+    out.append(tail.lstrip("\r\n"))
+    return "".join(out)
+
+
+def synthetic_summaries(count: int) -> List[ListingSummary]:
+    doc = make_soup(scaled_search_page(count), parse_only=LIST_CARDS)
+    return list(parse_cards(doc, SEARCH_URL))
+
+
+def synthetic_listings(count: int) -> List[ListingDetail]:
+    """
+    `count` fully populated ListingDetails, shaped like a real scrape.
+    """
+    return [
+        ListingDetail.from_summary(
+            s,
+            drift_cost_sek=6540,
+            floor_of="3 av 4",
+            booli_views=1287 + i,
+            days_on_booli=9,
+            ownership_type="bostadsrätt",
+            building_year=1948,
+            broker_name="Anders Ångström",
+            broker_company="Svensk Fastighetsförmedling",
+            broker_website_url=BROKER_URL,
+            broker_email="anders.angstrom@svenskfast.se",
+            broker_phone="070-123 45 67",
+            viewings=[Viewing(raw_text="7 dec Öppen visning, föranmäl dig gärna 13:30 – 14:00")],
+            profiles=["default"],
+            summary_fingerprint="0123456789abcdef",
+            enriched_at=1_765_000_000.0 + i,
+            first_seen_at=1_765_000_000.0,
+        )
+        for i, s in enumerate(synthetic_summaries(count))
+    ]
+
+
+@contextmanager
+def temp_storage(backend: str) -> Iterator[Path]:
+    """
+    Point real_estate.storage (and the sqlite backend, the HTTP cache, the
+    broker cache, the viewings feed, the change log and the market stats)
+    at a throwaway directory and `backend` for the duration of the block.
+    """
+    from real_estate import (
+        broker_cache, calendar_feed, changes, http_cache, market_stats, storage, storage_sqlite,
+    )
+
+    saved = (
+        storage.STORAGE_BACKEND,
+        storage.LISTINGS_PATH,
+        storage.LISTINGS_JSONL_PATH,
+        storage.SEEN_IDS_PATH,
+        storage_sqlite.DB_PATH,
+        http_cache._cache,
+        broker_cache._cache,
+        calendar_feed._feed,
+        changes._log,
+        market_stats._stats,
+    )
+    tmp = Path(tempfile.mkdtemp(prefix="re-bench-"))
+    storage.STORAGE_BACKEND = backend
+    storage.LISTINGS_PATH = tmp / "latest_listings.json"
+    storage.LISTINGS_JSONL_PATH = tmp / "latest_listings.jsonl"
+    storage.SEEN_IDS_PATH = tmp / "seen_ids.json"
+    storage_sqlite.DB_PATH = tmp / "listings.sqlite3"
+    http_cache._cache = http_cache.HttpCache(directory=tmp / "http_cache")
+    broker_cache._cache = broker_cache.BrokerCache(path=tmp / "broker_cache.json")
+    calendar_feed._feed = calendar_feed.ViewingsFeed(
+        path=tmp / "viewings_feed.json", feed_path=tmp / "viewings.ics"
+    )
+    changes._log = changes.ChangeLog(
+        tmp / "changes.jsonl", tmp / "changes.idx.json", tmp / "change_state.json"
+    )
+    market_stats._stats = market_stats.MarketStats(tmp / "market_stats.json")
+    try:
+        yield tmp
+    finally:
+        (
+            storage.STORAGE_BACKEND,
+            storage.LISTINGS_PATH,
+            storage.LISTINGS_JSONL_PATH,
+            storage.SEEN_IDS_PATH,
+            storage_sqlite.DB_PATH,
+            http_cache._cache,
+            broker_cache._cache,
+            calendar_feed._feed,
+            changes._log,
+            market_stats._stats,
+        ) = saved
+        shutil.rmtree(tmp, ignore_errors=True)
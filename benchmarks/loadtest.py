@@ -0,0 +1,122 @@
+# benchmarks/loadtest.py
+"""
+End-to-end load test: get_interesting_apartments() against the local
+Booli stand-in, which runs in a child process so its CPU and memory
+don't count. Storage and caches go to a throwaway directory.
+
+    python -m benchmarks.loadtest --listings 10000 --latency-ms 20 --runs 2
+
+Run 1 is a cold scrape; later runs show the incremental steady state.
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+from real_estate import controllers, http_client, metrics, pipeline
+
+from .booli_standin import StandinConfig, add_arguments, config_from_args, make_standin
+from .fixtures import temp_storage
+
+
+def _serve(config: StandinConfig, ports) -> None:
+    server = make_standin(config)
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _timer_total_ms(name: str) -> float:
+    return sum(t["sum_ms"] for t in metrics.as_dict()["timers"] if t["name"] == name)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    add_arguments(parser)
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--backend", default="json", choices=("json", "jsonl", "sqlite"))
+    parser.add_argument("--workers", type=int, default=None, help="DETAIL_WORKERS override")
+    parser.add_argument("--per-host", type=int, default=None, help="MAX_REQUESTS_PER_HOST override")
+    parser.add_argument("--mode", choices=("threads", "pipeline"), default=None, help="ENRICH_MODE override")
+    parser.add_argument("--parse-workers", type=int, default=None, help="PARSE_WORKERS override (pipeline)")
+    parser.add_argument("--http-cache", action="store_true", help="keep the HTTP cache on")
+    parser.add_argument(
+        "--no-resilience", action="store_true",
+        help="plain requests: no adaptive timeouts, retries or circuit breaker",
+    )
+    parser.add_argument("--hedge", action="store_true", help="hedge Booli detail fetches")
+    parser.add_argument("--table", action="store_true", help="print the per-stage metrics table")
+    args = parser.parse_args(argv)
+    config = config_from_args(args)
+
+    if args.workers is not None:
+        controllers.DETAIL_WORKERS = args.workers
+    if args.per_host is not None:
+        http_client.MAX_REQUESTS_PER_HOST = args.per_host
+    if args.mode is not None:
+        controllers.ENRICH_MODE = args.mode
+    if args.parse_workers is not None:
+        pipeline.PARSE_WORKERS = args.parse_workers
+    http_client.HTTP_CACHE_ENABLED = args.http_cache
+    http_client.HTTP_RESILIENCE = not args.no_resilience
+    if args.hedge:
+        http_client.HEDGE_URL_CLASSES = ("detail",)
+
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(config, ports), daemon=True)
+    server.start()
+    search_url = f"http://127.0.0.1:{ports.get(timeout=30)}/sok/till-salu"
+
+    print(
+        f"{config.listings} listings, {config.per_page}/page, latency {config.latency_ms}"
+        f"+{config.jitter_ms} ms (broker +{config.broker_latency_ms} ms), "
+        f"errors {config.error_rate:.1%}, backend {args.backend}, "
+        f"enrich {controllers.ENRICH_MODE}, "
+        f"resilience {'on' if http_client.HTTP_RESILIENCE else 'off'}"
+        f"{' + hedging' if args.hedge else ''}, "
+        f"RSS at start {peak_rss_mib():.0f} MiB"
+    )
+    print(
+        f"{'run':>3} {'listings':>9} {'enriched':>9} {'reused':>7} {'failed':>7} "
+        f"{'seconds':>8} {'listings/s':>10} {'save ms':>8} {'peak RSS MiB':>13}"
+    )
+    try:
+        with temp_storage(args.backend):
+            for run in range(1, args.runs + 1):
+                metrics.reset()
+                started = time.perf_counter()
+                details = controllers.get_interesting_apartments(
+                    {"loadtest": search_url}, max_pages=None
+                )
+                elapsed = time.perf_counter() - started
+                last = controllers.LAST_RUN
+                print(
+                    f"{run:>3} {len(details):>9} {last['enriched']:>9} {last['reused']:>7} "
+                    f"{last['failed']:>7} {elapsed:>8.1f} {len(details) / elapsed:>10.0f} "
+                    f"{_timer_total_ms('storage_save'):>8.0f} {peak_rss_mib():>13.0f}",
+                    flush=True,
+                )
+                del details
+        for host, r in sorted(http_client.resilience_stats().items()):
+            print(
+                f"{host}: circuit {r['state']} (opened {r['opened']}x, "
+                f"{r['short_circuited']} skipped), {r['retries']} retries, {r['hedges']} hedged, "
+                f"timeout {r['timeout_s']} s, p50/p99 {r['p50_ms']}/{r['p99_ms']} ms"
+            )
+        if args.table:
+            print()
+            print(metrics.summary_table())
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
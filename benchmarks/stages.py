@@ -0,0 +1,141 @@
+# benchmarks/stages.py
+
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List
+
+from real_estate import storage
+from real_estate.http_client import set_fetch_stub
+from real_estate.ics_parser import iter_ics_events, parse_single_ics_event
+from real_estate.market_stats import MarketStats
+from real_estate.scraper_detail import _scrape_svenskfast_broker, enrich_with_detail
+from real_estate.scraper_list import parse_list_page
+
+from .fixtures import (
+    BROKER_URL,
+    SEARCH_URL,
+    FixtureFetcher,
+    read,
+    scaled_search_page,
+    synthetic_calendar,
+    synthetic_listings,
+    synthetic_summaries,
+    temp_storage,
+)
+
+
+@dataclass
+class Stage:
+    """
+    One thing to time. `setup(scale)` prepares fixtures and returns the
+    zero-argument callable that gets timed; `teardown` undoes the setup.
+    """
+
+    name: str
+    setup: Callable[[int], Callable[[], object]]
+    teardown: Callable[[], None] = lambda: None
+
+
+def _stub(search_page: str) -> None:
+    set_fetch_stub(FixtureFetcher(search_page))
+
+
+def _unstub() -> None:
+    set_fetch_stub(None)
+
+
+def _list_page(cards: int):
+    def setup(scale: int):
+        _stub(read("booli_search.html") if cards is None else scaled_search_page(cards * scale))
+        return lambda: parse_list_page(SEARCH_URL)
+    return setup
+
+
+def _enrich(scale: int):
+    _stub(read("booli_search.html"))
+    summary = synthetic_summaries(1)[0]
+    return lambda: enrich_with_detail(summary)
+
+
+def _broker(scale: int):
+    _stub(read("booli_search.html"))
+    # the uncached download + parse (the cached path is a dict lookup)
+    return lambda: _scrape_svenskfast_broker(BROKER_URL)
+
+
+def _ics(scale: int):
+    text = read("viewing.ics")
+    return lambda: parse_single_ics_event(text)
+
+
+def _ics_stream(scale: int):
+    text = synthetic_calendar(500 * scale)
+    return lambda: sum(1 for _ in iter_ics_events(text))
+
+
+def _ics_legacy(scale: int):
+    # the old parser handles one VEVENT per call: feed it event by event
+    from .legacy_ics import parse_single_ics_event as legacy
+
+    chunks = synthetic_calendar(500 * scale).split("BEGIN:VEVENT")[1:]
+    return lambda: [legacy(chunk) for chunk in chunks]
+
+
+def _market_stats(arrivals: bool):
+    def setup(scale: int):
+        listings = synthetic_listings(1000 * scale)
+        if arrivals:
+            # every listing is new: P² updates for each of them
+            return lambda: MarketStats(Path(tempfile.gettempdir()) / "unused.json").record(listings)
+        stats = MarketStats(Path(tempfile.gettempdir()) / "unused.json")
+        stats.record(listings)
+        return lambda: stats.record(listings)
+    return setup
+
+
+class _Storage:
+    """
+    save_listings / load_listings for one backend, on 1000*scale listings
+    in a throwaway directory.
+    """
+
+    def __init__(self, backend: str, op: str):
+        self.backend = backend
+        self.op = op
+        self._ctx = None
+
+    def setup(self, scale: int):
+        listings = synthetic_listings(1000 * scale)
+        self._ctx = temp_storage(self.backend)
+        self._ctx.__enter__()
+        storage.save_listings(listings)
+        if self.op == "save":
+            return lambda: storage.save_listings(listings)
+        return storage.load_listings
+
+    def teardown(self) -> None:
+        self._ctx.__exit__(None, None, None)
+
+
+def _storage_stages() -> List[Stage]:
+    stages = []
+    for backend in ("json", "jsonl", "sqlite"):
+        for op in ("save", "load"):
+            s = _Storage(backend, op)
+            stages.append(Stage(f"storage.{op}_listings[{backend}]", s.setup, s.teardown))
+    return stages
+
+
+STAGES: List[Stage] = [
+    Stage("list.parse_list_page", _list_page(None), _unstub),
+    Stage("list.parse_list_page[400 cards]", _list_page(400), _unstub),
+    Stage("detail.enrich_with_detail", _enrich, _unstub),
+    Stage("detail._fetch_broker_from_svenskfast", _broker, _unstub),
+    Stage("ics.parse_single_ics_event", _ics),
+    Stage("ics.iter_ics_events[500 events]", _ics_stream),
+    Stage("ics.legacy_parser[500 events]", _ics_legacy),
+    Stage("market_stats.record[1000 new]", _market_stats(True)),
+    Stage("market_stats.record[1000 unchanged]", _market_stats(False)),
+    *_storage_stages(),
+]
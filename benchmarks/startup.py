@@ -0,0 +1,120 @@
+# benchmarks/startup.py
+"""
+CLI startup: `python -X importtime` figures for real_estate.main, and the
+wall time of the read-only subcommands. These must not load the HTML /
+HTTP stack (requests, bs4, lxml) at all.
+
+    python -m benchmarks.startup            # report
+    python -m benchmarks.startup --check    # exit 1 over budget or on a heavy import
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# only the scrape path may import these
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "lxml", "cssselect", "charset_normalizer")
+
+# (label, argv after `python -m real_estate.main`)
+COMMANDS = (
+    ("list", ["list"]),
+    ("new-since", ["new-since", "7d"]),
+    ("export jsonl", ["export", "--format", "jsonl"]),
+)
+
+DEFAULT_BUDGET_MS = 50.0
+
+
+def import_times(statement: str) -> Dict[str, Tuple[int, int]]:
+    """
+    {module: (self us, cumulative us)} from `python -X importtime -c statement`.
+    Modules the bare interpreter imports anyway (site, encodings) are left out.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, check=True,
+    )
+    times: Dict[str, Tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        times[name.strip()] = (int(own), int(cumulative))
+    baseline = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "pass"],
+        capture_output=True, text=True, check=True,
+    ).stderr
+    for line in baseline.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            times.pop(line.rsplit("|", 1)[1].strip(), None)
+    return times
+
+
+def total_ms(times: Dict[str, Tuple[int, int]]) -> float:
+    return sum(own for own, _ in times.values()) / 1000
+
+
+def wall_ms(argv: List[str], runs: int) -> float:
+    """
+    Median wall time of `python -m real_estate.main argv`, in ms.
+    """
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "real_estate.main", *argv],
+            stdout=subprocess.DEVNULL, check=True,
+        )
+        samples.append(1000 * (time.perf_counter() - started))
+    return statistics.median(samples)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--runs", type=int, default=5, help="wall-time runs per command")
+    parser.add_argument(
+        "--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+        help="--check: max import time of real_estate.main",
+    )
+    parser.add_argument("--top", type=int, default=8, help="slowest modules to list")
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args(argv)
+
+    cli = import_times("import real_estate.main")
+    scrape = import_times("import real_estate.main, real_estate.controllers")
+    heavy = sorted(name for name in cli if name.split(".")[0] in HEAVY_MODULES)
+
+    print(f"Python {sys.version.split()[0]}, {os.cpu_count()} CPUs")
+    print(f"import real_estate.main           {total_ms(cli):>8.1f} ms  ({len(cli)} modules)")
+    print(f"  + controllers (scrape path)     {total_ms(scrape):>8.1f} ms  ({len(scrape)} modules)")
+    print(f"\nSlowest imports for the read-only CLI (self time):")
+    for name, (own, _) in sorted(cli.items(), key=lambda kv: -kv[1][0])[: args.top]:
+        print(f"  {name:<40} {own / 1000:>7.1f} ms")
+
+    baseline_ms = 0.0
+    if args.runs:
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline_ms = 1000 * (time.perf_counter() - started) / args.runs
+        print(f"\nWall time, median of {args.runs} (bare interpreter: {baseline_ms:.0f} ms)")
+        for label, command in COMMANDS:
+            print(f"  {label:<40} {wall_ms(command, args.runs):>7.0f} ms")
+
+    problems = []
+    if heavy:
+        problems.append(f"read-only CLI imports {', '.join(heavy)}")
+    if total_ms(cli) > args.budget_ms:
+        problems.append(f"import real_estate.main took {total_ms(cli):.1f} ms (budget {args.budget_ms:g})")
+    for problem in problems:
+        print(f"\n[FAIL] {problem}")
+    if args.check and problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+# real_estate/api.py
+
+import gzip
+import hashlib
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .config import API_HOST, API_PORT, API_QUERY_CACHE_SIZE
+from .models import ListingDetail
+from .storage import listing_to_json
+
+# Query parameters of GET /listings
+QUERY_PARAMS = ("area", "city", "min_price", "max_price", "new_since")
+# ... and of GET /stats
+STATS_PARAMS = ("area", "city")
+
+JSON_TYPE = "application/json; charset=utf-8"
+CALENDAR_TYPE = "text/calendar; charset=utf-8"
+
+
+class BadQuery(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Response:
+    """
+    A ready-to-send body (JSON unless said otherwise), its gzip version
+    and their ETags.
+    """
+
+    body: bytes
+    gzipped: bytes
+    etag: str
+    content_type: str = JSON_TYPE
+
+    @classmethod
+    def build(cls, body: bytes, content_type: str = JSON_TYPE) -> "Response":
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        return cls(body, gzip.compress(body, compresslevel=6, mtime=0), f'"{digest}"', content_type)
+
+
+def _parse_since(value: str) -> float:
+    """
+    Epoch seconds, or an ISO date/datetime (local time unless it has an offset).
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise BadQuery(f"new_since: expected epoch seconds or ISO date, got {value!r}")
+
+
+def _parse_int(name: str, value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise BadQuery(f"{name}: expected an integer, got {value!r}")
+
+
+class Snapshot:
+    """
+    One scrape's listings, serialized once, plus the lookup tables the
+    queries need. Immutable apart from its bounded response cache.
+    """
+
+    def __init__(self, listings: Iterable[ListingDetail]):
+        self.listings = list(listings)
+        self.items = [listing_to_json(l).encode("utf-8") for l in self.listings]
+        self.by_id = {l.booli_id: i for i, l in enumerate(self.listings)}
+
+        self.by_area: Dict[str, List[int]] = {}
+        self.by_city: Dict[str, List[int]] = {}
+        for i, l in enumerate(self.listings):
+            self.by_area.setdefault((l.area or "").casefold(), []).append(i)
+            self.by_city.setdefault((l.city or "").casefold(), []).append(i)
+
+        # (value, position) sorted by value, for range lookups with bisect
+        self.prices = sorted((l.price_sek, i) for i, l in enumerate(self.listings))
+        self.first_seen = sorted(
+            (l.first_seen_at or 0.0, i) for i, l in enumerate(self.listings)
+        )
+
+        self.all = self._render(range(len(self.items)))
+        self._cache: "OrderedDict[Tuple, Response]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _render(self, positions: Iterable[int]) -> Response:
+        return Response.build(b"[" + b",".join(self.items[i] for i in positions) + b"]")
+
+    def _positions(self, key: Tuple) -> List[int]:
+        params = dict(key)
+        sets = []
+        if "area" in params:
+            sets.append(set(self.by_area.get(params["area"], ())))
+        if "city" in params:
+            sets.append(set(self.by_city.get(params["city"], ())))
+        if "min_price" in params or "max_price" in params:
+            lo = bisect_left(self.prices, (params.get("min_price", float("-inf")), -1))
+            hi = bisect_right(self.prices, (params.get("max_price", float("inf")), len(self.items)))
+            sets.append({i for _, i in self.prices[lo:hi]})
+        if "new_since" in params:
+            lo = bisect_left(self.first_seen, (params["new_since"], -1))
+            sets.append({i for _, i in self.first_seen[lo:]})
+        if not sets:
+            return list(range(len(self.items)))
+        # keep the stored order
+        return sorted(set.intersection(*sets))
+
+    def _cached(self, key: Tuple, build: Callable[[], Response]) -> Response:
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                return hit
+        response = build()
+        with self._lock:
+            self._cache[key] = response
+            while len(self._cache) > API_QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return response
+
+    def query(self, key: Tuple) -> Response:
+        if not key:
+            return self.all
+        return self._cached(key, lambda: self._render(self._positions(key)))
+
+    def listing(self, booli_id: int) -> Optional[Response]:
+        i = self.by_id.get(booli_id)
+        if i is None:
+            return None
+        return self._cached((("booli_id", booli_id),), lambda: Response.build(self.items[i]))
+
+    def calendar(self) -> Response:
+        """
+        The upcoming-viewings feed for this snapshot's listings.
+        """
+        return self._cached(("viewings.ics",), self._render_calendar)
+
+    def stats(self, key: Tuple) -> Optional[Response]:
+        """
+        Market stats of one area or city (key from stats_key()), or of all
+        of them for an empty key; None for an unknown area/city.
+        """
+        response = self._cached(("stats",) + key, lambda: self._render_stats(key))
+        return response if response.body != b"null" else None
+
+    def _render_stats(self, key: Tuple) -> Response:
+        from .market_stats import GROUP_KINDS, get_market_stats
+
+        stats = get_market_stats()
+        if key:
+            (kind, name), = key
+            group = stats.get(kind, name)
+            body = group.summary() if group is not None else None
+        else:
+            body = {kind: [g.summary() for g in stats.groups(kind)] for kind in GROUP_KINDS}
+        return Response.build(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+
+    def _render_calendar(self) -> Response:
+        from .calendar_feed import get_viewings_feed
+
+        text = get_viewings_feed().render(self.listings)
+        return Response.build(text.encode("utf-8"), CALENDAR_TYPE)
+
+
+def query_key(query: str) -> Tuple:
+    """
+    Normalise a query string to a hashable cache key; raises BadQuery.
+    """
+    raw = parse_qs(query, keep_blank_values=False)
+    unknown = set(raw) - set(QUERY_PARAMS)
+    if unknown:
+        raise BadQuery(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    params = {}
+    for name, values in raw.items():
+        value = values[-1]
+        if name in ("area", "city"):
+            params[name] = value.casefold()
+        elif name == "new_since":
+            params[name] = _parse_since(value)
+        else:
+            params[name] = _parse_int(name, value)
+    return tuple(sorted(params.items()))
+
+
+def stats_key(query: str) -> Tuple:
+    """
+    GET /stats query -> () or ((kind, name),); raises BadQuery.
+    """
+    raw = parse_qs(query, keep_blank_values=False)
+    unknown = set(raw) - set(STATS_PARAMS)
+    if unknown:
+        raise BadQuery(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    if len(raw) > 1:
+        raise BadQuery("pass either area or city")
+    return tuple((name, values[-1].casefold()) for name, values in raw.items())
+
+
+class ListingIndex:
+    """
+    The listing set the API serves. update() swaps in a new snapshot
+    atomically; requests in flight keep using the one they started with.
+    """
+
+    def __init__(self, listings: Iterable[ListingDetail] = ()):
+        self.snapshot = Snapshot(listings)
+
+    def update(self, listings: Iterable[ListingDetail]) -> None:
+        self.snapshot = Snapshot(listings)
+
+
+def _error(message: str) -> bytes:
+    return json.dumps({"error": message}).encode("utf-8")
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    GET /listings[?area=&city=&min_price=&max_price=&new_since=]
+    GET /listings/<booli_id>
+    GET /viewings.ics
+    GET /stats[?area=|city=]
+    """
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes: don't let Nagle hold the body
+    disable_nagle_algorithm = True
+    server_version = "real-estate-api"
+    index: ListingIndex  # set by make_server
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        snapshot = self.index.snapshot
+        try:
+            if path == "/listings":
+                response = snapshot.query(query_key(url.query))
+            elif path == "/viewings.ics":
+                response = snapshot.calendar()
+            elif path == "/stats":
+                response = snapshot.stats(stats_key(url.query))
+                if response is None:
+                    return self._send_plain(404, _error("no stats for that area/city"))
+            elif path.startswith("/listings/"):
+                booli_id = _parse_int("booli_id", path[len("/listings/"):])
+                response = snapshot.listing(booli_id)
+                if response is None:
+                    return self._send_plain(404, _error(f"no listing {booli_id}"))
+            else:
+                return self._send_plain(404, _error("not found"))
+        except BadQuery as exc:
+            return self._send_plain(400, _error(str(exc)))
+        self._send(response)
+
+    def _send(self, response: Response) -> None:
+        use_gzip = self._accepts_gzip()
+        etag = response.etag[:-1] + '-gz"' if use_gzip else response.etag
+        if etag in self._if_none_match():
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = response.gzipped if use_gzip else response.body
+        self.send_response(200)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_plain(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", JSON_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _accepts_gzip(self) -> bool:
+        """
+        Accept-Encoding lists gzip (or x-gzip, or *) with a q above 0.
+        """
+        qualities: Dict[str, float] = {}
+        for part in self.headers.get("Accept-Encoding", "").split(","):
+            coding, *params = [p.strip() for p in part.split(";")]
+            q = 1.0
+            for param in params:
+                key, _, value = param.partition("=")
+                if key.strip().lower() == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            qualities[coding.lower()] = q
+        for coding in ("gzip", "x-gzip", "*"):
+            if coding in qualities:
+                return qualities[coding] > 0
+        return False
+
+    def _if_none_match(self) -> List[str]:
+        header = self.headers.get("If-None-Match", "")
+        return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+    def log_message(self, format, *args) -> None:
+        # one line per request would cost more than serving it
+        pass
+
+
+def make_server(
+    index: ListingIndex,
+    host: str = API_HOST,
+    port: int = API_PORT,
+) -> ThreadingHTTPServer:
+    handler = type("BoundHandler", (Handler,), {"index": index})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_in_background(server: ThreadingHTTPServer) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, name="api", daemon=True)
+    thread.start()
+    return thread
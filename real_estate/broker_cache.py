@@ -0,0 +1,151 @@
+# real_estate/broker_cache.py
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import BROKER_CACHE_TTL_SECONDS, BROKER_CACHE_MAX_ENTRIES
+from .storage import DATA_DIR
+
+BROKER_CACHE_PATH = DATA_DIR / "broker_cache.json"
+
+# (broker_name, broker_phone, broker_email)
+BrokerInfo = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+@dataclass
+class BrokerEntry:
+    url: str
+    name: Optional[str]
+    phone: Optional[str]
+    email: Optional[str]
+    fetched_at: float
+
+    @property
+    def info(self) -> BrokerInfo:
+        return self.name, self.phone, self.email
+
+
+class BrokerCache:
+    """
+    Broker info per broker page URL, persisted as one JSON file. Entries
+    expire after `ttl` seconds; past `max_entries` the least recently used
+    go first. Concurrent lookups of the same URL share one fetch.
+    """
+
+    def __init__(
+        self,
+        path: Path = BROKER_CACHE_PATH,
+        ttl: float = BROKER_CACHE_TTL_SECONDS,
+        max_entries: int = BROKER_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: Optional["OrderedDict[str, BrokerEntry]"] = None
+        self._inflight: Dict[str, Future] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _index(self) -> "OrderedDict[str, BrokerEntry]":
+        if self._entries is None:
+            entries: "OrderedDict[str, BrokerEntry]" = OrderedDict()
+            if self.path.exists():
+                try:
+                    with self.path.open("r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                    # stored least recently used first
+                    for item in raw:
+                        entry = BrokerEntry(**item)
+                        entries[entry.url] = entry
+                except (ValueError, TypeError):
+                    entries = OrderedDict()  # corrupt file: start over
+            self._entries = entries
+        return self._entries
+
+    def get(self, url: str, fetch: Callable[[str], BrokerInfo]) -> BrokerInfo:
+        """
+        Cached info for `url`, or fetch(url). If another thread is already
+        fetching `url`, wait for its result instead. Errors from fetch are
+        passed on to every waiter and nothing is cached.
+        """
+        owner = False
+        with self._lock:
+            entries = self._index()
+            entry = entries.get(url)
+            if entry is not None and time.time() - entry.fetched_at < self.ttl:
+                entries.move_to_end(url)
+                self._dirty = True  # persist the new LRU order
+                self.hits += 1
+                return entry.info
+            pending = self._inflight.get(url)
+            if pending is not None:
+                self.coalesced += 1
+            else:
+                pending = self._inflight[url] = Future()
+                self.misses += 1
+                owner = True
+        if not owner:
+            return pending.result()
+
+        try:
+            info = fetch(url)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[url]
+            pending.set_exception(exc)
+            raise
+
+        with self._lock:
+            entries = self._index()
+            entries[url] = BrokerEntry(url, *info, fetched_at=time.time())
+            entries.move_to_end(url)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._dirty = True
+            del self._inflight[url]
+        pending.set_result(info)
+        return info
+
+    def flush(self) -> None:
+        """
+        Write the cache to disk if anything changed.
+        """
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump([asdict(e) for e in self._entries.values()], f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+        }
+
+
+_cache: Optional[BrokerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_broker_cache() -> BrokerCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = BrokerCache()
+    return _cache
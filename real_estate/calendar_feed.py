@@ -0,0 +1,326 @@
+# real_estate/calendar_feed.py
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from .metrics import count, timed
+from .models import ListingDetail, Viewing
+from .storage import DATA_DIR, _atomic_write
+
+VIEWINGS_FEED_PATH = DATA_DIR / "viewings.ics"
+FEED_CACHE_PATH = DATA_DIR / "viewings_feed.json"
+
+FEED_TIMEZONE = "Europe/Stockholm"
+UID_DOMAIN = "real-estate.local"
+
+KIND_LABELS = {
+    "open": "Öppen visning",
+    "private": "Privat visning",
+    "digital": "Digital visning",
+}
+
+_HEADER = (
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//real_estate//viewings//SV",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+    "X-WR-CALNAME:Visningar",
+    f"X-WR-TIMEZONE:{FEED_TIMEZONE}",
+    "BEGIN:VTIMEZONE",
+    f"TZID:{FEED_TIMEZONE}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0100",
+    "TZOFFSETTO:+0200",
+    "TZNAME:CEST",
+    "DTSTART:19700329T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0100",
+    "TZNAME:CET",
+    "DTSTART:19701025T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+)
+_HEADER_TEXT = "".join(line + "\r\n" for line in _HEADER)
+_FOOTER_TEXT = "END:VCALENDAR\r\n"
+
+
+@dataclass
+class FeedEvent:
+    """
+    One rendered VEVENT. `content_hash` covers everything but DTSTAMP and
+    SEQUENCE, which only move when the content does.
+    """
+
+    uid: str
+    content_hash: str
+    stamp: str  # DTSTAMP, UTC
+    sequence: int
+    ends_at: float  # epoch seconds, for dropping past viewings
+    text: str
+
+
+def viewing_uid(booli_id: int, viewing: Viewing) -> str:
+    """
+    Same listing, day and start time -> same UID, across runs.
+    """
+    return f"{booli_id}-{viewing.date.replace('-', '')}T{viewing.start.replace(':', '')}@{UID_DOMAIN}"
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """
+    RFC 5545 line folding: at most 75 octets per line, never splitting a
+    UTF-8 sequence.
+    """
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    parts: List[str] = []
+    current: List[str] = []
+    size = 0
+    limit = 75
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > limit:
+            parts.append("".join(current))
+            current = []
+            size = 0
+            limit = 74  # continuation lines start with a space
+        current.append(ch)
+        size += n
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _local(viewing_date: str, clock: str) -> str:
+    return f"{viewing_date.replace('-', '')}T{clock.replace(':', '')}00"
+
+
+def _epoch(viewing_date: str, clock: str) -> float:
+    dt = datetime.fromisoformat(f"{viewing_date}T{clock}").replace(tzinfo=ZoneInfo(FEED_TIMEZONE))
+    return dt.timestamp()
+
+
+def _utc_stamp(now: float) -> str:
+    return datetime.fromtimestamp(now, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _description(listing: ListingDetail, viewing: Viewing) -> str:
+    lines = [KIND_LABELS.get(viewing.kind or "", "Visning")]
+    facts = [f"{listing.price_sek:,} kr".replace(",", " ")]
+    if listing.living_area_m2:
+        facts.append(f"{listing.living_area_m2:g} m²".replace(".", ","))
+    if listing.rooms:
+        facts.append(f"{listing.rooms:g} rum".replace(".", ","))
+    if listing.monthly_fee_sek:
+        facts.append(f"avgift {listing.monthly_fee_sek:,} kr/mån".replace(",", " "))
+    lines.append(", ".join(facts))
+    broker = ", ".join(
+        x for x in (listing.broker_name, listing.broker_company, listing.broker_phone) if x
+    )
+    if broker:
+        lines.append(f"Mäklare: {broker}")
+    lines.append(listing.url)
+    return "\n".join(lines)
+
+
+def _event_body(listing: ListingDetail, viewing: Viewing, uid: str) -> str:
+    """
+    The VEVENT properties that depend on the listing, i.e. all but
+    BEGIN/END, DTSTAMP and SEQUENCE.
+    """
+    location = ", ".join(x for x in (listing.address, listing.area, listing.city) if x)
+    props = (
+        f"UID:{uid}",
+        f"DTSTART;TZID={FEED_TIMEZONE}:{_local(viewing.date, viewing.start)}",
+        f"DTEND;TZID={FEED_TIMEZONE}:{_local(viewing.date, viewing.end)}",
+        f"SUMMARY:{_escape('Visning ' + listing.address)}",
+        f"LOCATION:{_escape(location)}",
+        f"DESCRIPTION:{_escape(_description(listing, viewing))}",
+        f"URL:{listing.url}",
+    )
+    return "".join(_fold(p) for p in props)
+
+
+def _listing_key(listing: ListingDetail) -> str:
+    """
+    Hash of every listing field the events are rendered from.
+    """
+    rendered = (
+        listing.booli_id, listing.url, listing.address, listing.area, listing.city,
+        listing.price_sek, listing.living_area_m2, listing.rooms, listing.monthly_fee_sek,
+        listing.broker_name, listing.broker_company, listing.broker_phone,
+        [(v.date, v.start, v.end, v.kind) for v in listing.viewings or ()],
+    )
+    return hashlib.blake2b(repr(rendered).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _schedulable(viewing: Viewing) -> bool:
+    return bool(viewing.date and viewing.start and viewing.end)
+
+
+class ViewingsFeed:
+    """
+    An .ics calendar of the upcoming viewings of every tracked listing.
+    Rendered VEVENTs are kept per listing (on disk between runs), and a
+    listing's events are only rendered again when a field they show has
+    changed. An event whose content comes out the same keeps its DTSTAMP
+    and SEQUENCE, so unchanged events stay byte-identical in the feed.
+    """
+
+    def __init__(self, path: Path = FEED_CACHE_PATH, feed_path: Path = VIEWINGS_FEED_PATH):
+        self.path = path
+        self.feed_path = feed_path
+        self.rendered = 0
+        self.reused = 0
+        self._listings: Optional[Dict[int, Tuple[str, List[FeedEvent]]]] = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _index(self) -> Dict[int, Tuple[str, List[FeedEvent]]]:
+        if self._listings is None:
+            listings: Dict[int, Tuple[str, List[FeedEvent]]] = {}
+            if self.path.exists():
+                try:
+                    with self.path.open("r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                    for booli_id, (key, events) in raw.items():
+                        listings[int(booli_id)] = (key, [FeedEvent(**e) for e in events])
+                except (ValueError, TypeError):
+                    listings = {}  # corrupt file: render everything again
+            self._listings = listings
+        return self._listings
+
+    def _events_for(
+        self,
+        listing: ListingDetail,
+        cached: Optional[Tuple[str, List[FeedEvent]]],
+        now: float,
+    ) -> Tuple[str, List[FeedEvent]]:
+        key = _listing_key(listing)
+        if cached is not None and cached[0] == key:
+            self.reused += len(cached[1])
+            return cached
+
+        previous = {e.uid: e for e in cached[1]} if cached else {}
+        events: List[FeedEvent] = []
+        seen = set()
+        for viewing in listing.viewings or ():
+            if not _schedulable(viewing):
+                continue
+            uid = viewing_uid(listing.booli_id, viewing)
+            if uid in seen:
+                continue
+            seen.add(uid)
+            body = _event_body(listing, viewing, uid)
+            content_hash = hashlib.blake2b(body.encode("utf-8"), digest_size=12).hexdigest()
+            old = previous.get(uid)
+            if old is not None and old.content_hash == content_hash:
+                events.append(old)
+                self.reused += 1
+                continue
+            stamp = _utc_stamp(now)
+            sequence = old.sequence + 1 if old is not None else 0
+            text = (
+                "BEGIN:VEVENT\r\n"
+                f"DTSTAMP:{stamp}\r\n"
+                f"SEQUENCE:{sequence}\r\n"
+                f"{body}"
+                "END:VEVENT\r\n"
+            )
+            events.append(
+                FeedEvent(uid, content_hash, stamp, sequence, _epoch(viewing.date, viewing.end), text)
+            )
+            self.rendered += 1
+        return key, events
+
+    def render(self, listings: Iterable[ListingDetail], now: Optional[float] = None) -> str:
+        """
+        The feed for `listings`. Listings that are no longer passed in are
+        dropped from the cache; viewings that have ended are left out.
+        """
+        now = time.time() if now is None else now
+        with timed("viewings_feed"), self._lock:
+            cache = self._index()
+            current: Dict[int, Tuple[str, List[FeedEvent]]] = {}
+            for listing in listings:
+                entry = self._events_for(listing, cache.get(listing.booli_id), now)
+                if entry is not cache.get(listing.booli_id):
+                    self._dirty = True
+                current[listing.booli_id] = entry
+            if current.keys() != cache.keys():
+                self._dirty = True
+            self._listings = current
+
+            upcoming = sorted(
+                (e for _, events in current.values() for e in events if e.ends_at >= now),
+                key=lambda e: (e.ends_at, e.uid),
+            )
+            text = _HEADER_TEXT + "".join(e.text for e in upcoming) + _FOOTER_TEXT
+        count("viewings_feed_events", len(upcoming))
+        return text
+
+    def write(self, listings: Iterable[ListingDetail], now: Optional[float] = None) -> bool:
+        """
+        Render the feed to feed_path and flush the fragment cache. The file
+        is only replaced when its content changed; returns whether it was.
+        """
+        text = self.render(listings, now)
+        self.flush()
+        path = self.feed_path
+        if path.exists() and path.read_bytes() == text.encode("utf-8"):
+            return False
+        with _atomic_write(path) as f:
+            f.write(text)
+        return True
+
+    def flush(self) -> None:
+        """
+        Write the fragment cache to disk if anything changed.
+        """
+        with self._lock:
+            if not self._dirty or self._listings is None:
+                return
+            raw = {
+                str(booli_id): [key, [asdict(e) for e in events]]
+                for booli_id, (key, events) in self._listings.items()
+            }
+            with _atomic_write(self.path) as f:
+                json.dump(raw, f, ensure_ascii=False)
+            self._dirty = False
+
+    def stats(self) -> Dict[str, int]:
+        return {"rendered": self.rendered, "reused": self.reused}
+
+
+_feed: Optional[ViewingsFeed] = None
+_feed_lock = threading.Lock()
+
+
+def get_viewings_feed() -> ViewingsFeed:
+    global _feed
+    if _feed is None:
+        with _feed_lock:
+            if _feed is None:
+                _feed = ViewingsFeed()
+    return _feed
@@ -0,0 +1,277 @@
+# real_estate/changes.py
+
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .metrics import count, timed
+from .models import ListingDetail
+from .storage import DATA_DIR, _atomic_write
+
+CHANGE_LOG_PATH = DATA_DIR / "changes.jsonl"
+CHANGE_INDEX_PATH = DATA_DIR / "changes.idx.json"
+CHANGE_STATE_PATH = DATA_DIR / "change_state.json"
+
+CHANGE_KINDS = ("new", "removed", "price_changed", "fee_changed", "status_changed")
+
+# tracked field -> event kind, in the order of a state entry
+TRACKED_FIELDS = (
+    ("price_sek", "price_changed"),
+    ("monthly_fee_sek", "fee_changed"),
+    ("status_text", "status_changed"),
+)
+
+Value = Union[int, str, None]
+# [price_sek, monthly_fee_sek, status_text, address]
+StateEntry = List[Value]
+
+
+@dataclass(slots=True)
+class ChangeEvent:
+    """
+    One line of the change log. `old`/`new` are the changed field's
+    values; for new/removed listings they hold the price.
+    """
+
+    at: float
+    booli_id: int
+    kind: str
+    old: Value = None
+    new: Value = None
+    address: Optional[str] = None
+
+
+def _entry(listing: ListingDetail) -> StateEntry:
+    return [*(getattr(listing, name) for name, _ in TRACKED_FIELDS), listing.address]
+
+
+def diff(
+    previous: Dict[int, StateEntry],
+    current: Dict[int, StateEntry],
+    at: float,
+    gone: Optional[Callable[[int], bool]] = None,
+) -> List[ChangeEvent]:
+    """
+    Events turning `previous` into `current`: one dict lookup per listing,
+    and a field-by-field look only at entries that differ. A listing
+    missing from `current` is removed only if `gone(booli_id)` (default:
+    always).
+    """
+    events: List[ChangeEvent] = []
+    for booli_id, entry in current.items():
+        before = previous.get(booli_id)
+        if before is None:
+            events.append(ChangeEvent(at, booli_id, "new", new=entry[0], address=entry[-1]))
+            continue
+        if before == entry:
+            continue
+        for i, (_, kind) in enumerate(TRACKED_FIELDS):
+            if before[i] != entry[i]:
+                events.append(ChangeEvent(at, booli_id, kind, before[i], entry[i], entry[-1]))
+    for booli_id, before in previous.items():
+        if booli_id not in current and (gone is None or gone(booli_id)):
+            events.append(ChangeEvent(at, booli_id, "removed", old=before[0], address=before[-1]))
+    return events
+
+
+class ChangeLog:
+    """
+    Append-only log of listing changes (one JSON event per line, in time
+    order) plus what it needs to stay cheap:
+      - the tracked fields of every current listing, to diff the next run
+        against without touching the listing store
+      - per listing, the byte offsets of its events, for price_history()
+    since() needs no index: the log is sorted by time, so it bisects.
+    """
+
+    def __init__(
+        self,
+        path: Path = CHANGE_LOG_PATH,
+        index_path: Path = CHANGE_INDEX_PATH,
+        state_path: Path = CHANGE_STATE_PATH,
+    ):
+        self.path = path
+        self.index_path = index_path
+        self.state_path = state_path
+        self._lock = threading.Lock()
+
+    # --- writing ---
+
+    def _load_state(self) -> Dict[int, StateEntry]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with self.state_path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+            return {int(k): v for k, v in raw["listings"].items()}
+        except (ValueError, KeyError, TypeError):
+            # unreadable: everything shows up as new once, then we're back
+            print("[WARN] change state unreadable, starting over", file=sys.stderr)
+            return {}
+
+    def record(
+        self,
+        listings: Iterable[ListingDetail],
+        now: Optional[float] = None,
+        gone: Optional[Callable[[int], bool]] = None,
+    ) -> List[ChangeEvent]:
+        """
+        Diff `listings` (the full current set) against the last recorded
+        set, append the events to the log and remember the new set.
+        `gone(booli_id)` says whether a listing missing from `listings` has
+        left the market; one that may not have (its search failed, it only
+        stopped matching a profile, ...) isn't logged as removed and keeps
+        its state entry. Without `gone`, every missing listing is removed.
+        """
+        now = time.time() if now is None else now
+        with timed("changes_record"), self._lock:
+            previous = self._load_state()
+            current = {l.booli_id: _entry(l) for l in listings}
+            events = diff(previous, current, now, gone)
+            state = current
+            if gone is not None:
+                state = {
+                    **{k: v for k, v in previous.items() if k not in current and not gone(k)},
+                    **current,
+                }
+            if events:
+                self._append(events)
+            with _atomic_write(self.state_path) as f:
+                json.dump(
+                    {"at": now, "listings": {str(k): v for k, v in state.items()}},
+                    f, ensure_ascii=False, separators=(",", ":"),
+                )
+        for event in events:
+            count("changes", kind=event.kind)
+        return events
+
+    def _append(self, events: Sequence[ChangeEvent]) -> None:
+        index = self._index()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        offset = index["size"]
+        with self.path.open("r+b" if self.path.exists() else "wb") as f:
+            f.truncate(offset)  # drop a half-written last line, if any
+            f.seek(offset)
+            for event in events:
+                line = json.dumps(asdict(event), ensure_ascii=False, separators=(",", ":"))
+                data = line.encode("utf-8") + b"\n"
+                f.write(data)
+                index["offsets"].setdefault(str(event.booli_id), []).append(offset)
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        index["size"] = offset
+        with _atomic_write(self.index_path) as f:
+            json.dump(index, f, separators=(",", ":"))
+
+    # --- reading ---
+
+    def _index(self) -> dict:
+        """
+        The offset index, brought up to date with the log: lines appended
+        after it was written (say, a crash in between) are indexed here.
+        "size" is where the last complete line ends.
+        """
+        index = {"size": 0, "offsets": {}}
+        if self.index_path.exists():
+            try:
+                with self.index_path.open("r", encoding="utf-8") as f:
+                    index = json.load(f)
+            except ValueError:
+                pass
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if index["size"] > size:
+            index = {"size": 0, "offsets": {}}  # log was replaced: rebuild
+        if index["size"] < size:
+            offset = index["size"]
+            with self.path.open("rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    booli_id = str(json.loads(line)["booli_id"])
+                    index["offsets"].setdefault(booli_id, []).append(offset)
+                    offset += len(line)
+            index["size"] = offset
+        return index
+
+    def since(self, t: float, kinds: Optional[Iterable[str]] = None) -> Iterator[ChangeEvent]:
+        """
+        Events logged at or after `t`, oldest first.
+        """
+        if not self.path.exists():
+            return
+        wanted = set(kinds) if kinds is not None else None
+        with self.path.open("rb") as f:
+            f.seek(_first_offset_since(f, self.path.stat().st_size, t))
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # half-written last line
+                raw = json.loads(line)
+                if raw["at"] < t:
+                    continue
+                if wanted is None or raw["kind"] in wanted:
+                    yield ChangeEvent(**raw)
+
+    def events_for(self, booli_id: int) -> List[ChangeEvent]:
+        """
+        Every logged event of one listing, oldest first.
+        """
+        offsets = self._index()["offsets"].get(str(booli_id), [])
+        events = []
+        if offsets:
+            with self.path.open("rb") as f:
+                for offset in offsets:
+                    f.seek(offset)
+                    events.append(ChangeEvent(**json.loads(f.readline())))
+        return events
+
+    def price_history(self, booli_id: int) -> List[Tuple[float, str, Optional[int]]]:
+        """
+        (time, kind, price) for every price we've seen on the listing,
+        starting when it first showed up: kind "new" or "price_changed"
+        (price None = not given), or "removed" (price None).
+        """
+        history: List[Tuple[float, str, Optional[int]]] = []
+        for event in self.events_for(booli_id):
+            if event.kind in ("new", "price_changed"):
+                history.append((event.at, event.kind, event.new))
+            elif event.kind == "removed":
+                history.append((event.at, event.kind, None))
+        return history
+
+
+def _first_offset_since(f, size: int, t: float) -> int:
+    """
+    Offset of a line at or before the first event logged at >= t, by
+    bisecting on byte offsets (each probe reads one line).
+    """
+    lo, hi = 0, size  # lo is always a line start with only older lines before it
+    while hi - lo > 4096:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()  # skip to the next line start
+        line = f.readline()
+        if line.endswith(b"\n") and json.loads(line)["at"] < t:
+            lo = f.tell()
+        else:
+            hi = mid
+    return lo
+
+
+_log: Optional[ChangeLog] = None
+_log_lock = threading.Lock()
+
+
+def get_change_log() -> ChangeLog:
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = ChangeLog()
+    return _log
@@ -10,11 +10,36 @@ SEARCH_URL = (
     "&maxListPrice=2000000"
 )
 
+# Named searches crawled on every run. Listings found by several searches
+# are fetched once and remember every search they came from.
+SEARCHES = {
+    "default": SEARCH_URL,
+    # "2-3 rum": "https://www.booli.se/sok/till-salu?areaIds=8521,4120&minRooms=2&maxRooms=3",
+}
+
 # Basic filters you care about (you can tweak later)
 MAX_PRICE_SEK = 2_000_000
 MIN_LIVING_AREA_M2 = 20.0
 MAX_MONTHLY_FEE_SEK = 3_500  # example
 
+# Buyer profiles: a listing is interesting if it matches at least one.
+# Keys (all optional): max_price_sek, min_living_area_m2, max_monthly_fee_sek,
+# min_rooms, max_rooms, min_floor, require_elevator, require_balcony,
+# require_outdoor_space. Missing listing values never rule a listing out.
+FILTER_PROFILES = {
+    "default": {
+        "max_price_sek": MAX_PRICE_SEK,
+        "min_living_area_m2": MIN_LIVING_AREA_M2,
+        "max_monthly_fee_sek": MAX_MONTHLY_FEE_SEK,
+    },
+    # "balcony": {
+    #     "max_price_sek": 2_500_000,
+    #     "min_living_area_m2": 30.0,
+    #     "require_balcony": True,
+    #     "min_floor": 2,
+    # },
+}
+
 # HTTP config
 USER_AGENT = (
     "bps-real-estate-looker/0.1 (personal use; contact: your-email@example.com)"
@@ -22,3 +47,139 @@ USER_AGENT = (
 
 REQUEST_TIMEOUT = 10
 
+# Per-host resilience (see resilience.py). False = one plain request per
+# fetch with REQUEST_TIMEOUT, like before.
+HTTP_RESILIENCE = True
+# Adaptive timeout: this many times the host's recent p99 latency, kept
+# within [min, REQUEST_TIMEOUT]. REQUEST_TIMEOUT until enough samples.
+ADAPTIVE_TIMEOUT_MULTIPLIER = 4.0
+ADAPTIVE_TIMEOUT_MIN_SECONDS = 1.0
+LATENCY_WINDOW = 200  # recent responses kept per host
+LATENCY_MIN_SAMPLES = 20
+# Timeouts, connection errors, 429 and 5xx are retried: at most this many
+# attempts per fetch, with exponential backoff (or the server's Retry-After)...
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.25
+RETRY_MAX_BACKOFF_SECONDS = 5.0
+# ...never waiting longer than this for a Retry-After (give up instead)...
+RETRY_AFTER_MAX_SECONDS = 30.0
+# ...and within a per-host budget: every request earns this many retries,
+# saved up to at most RETRY_BUDGET_MIN (the burst a failing host gets).
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MIN = 10
+# Circuit breaker: after this many failures in a row (errors, or answers
+# slower than CIRCUIT_SLOW_CALL_SECONDS) a host gets no requests for the
+# cooldown; then a single probe decides whether it's back.
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_SLOW_CALL_SECONDS = 3.0
+CIRCUIT_COOLDOWN_SECONDS = 30.0
+# Hedged requests: for these URL classes ("search", "detail", "broker"),
+# a fetch still unanswered after the host's p95 latency gets a second,
+# identical request and the first answer wins. Costs extra load on the
+# host, so it's off by default and capped at HEDGE_MAX_RATIO of requests.
+HEDGE_URL_CLASSES = ()  # e.g. ("detail",)
+HEDGE_MIN_DELAY_SECONDS = 0.05
+HEDGE_MAX_RATIO = 0.05
+
+
+# Concurrent detail enrichment
+# Number of listings enriched in parallel (1 = sequential, like before).
+DETAIL_WORKERS = 8
+# Max simultaneous requests to a single host (booli.se, svenskfast.se, ...).
+MAX_REQUESTS_PER_HOST = 4
+
+# How detail pages are parsed:
+#   "threads"  - each enrichment thread fetches and parses its own pages
+#                (parsing is serialized by the GIL)
+#   "pipeline" - DETAIL_WORKERS threads only fetch; raw HTML goes through a
+#                bounded queue to PARSE_WORKERS processes (see pipeline.py)
+ENRICH_MODE = "threads"
+# Parser processes for "pipeline" (None = one per CPU).
+PARSE_WORKERS = None
+# Fetched pages allowed to wait for a parser before fetching pauses.
+PIPELINE_QUEUE_SIZE = 32
+
+# Shared HTTP session (keep-alive connection pooling)
+# Number of distinct hosts to keep a connection pool for.
+HTTP_POOL_HOSTS = 10
+# Max idle keep-alive connections kept per host. Should be >= MAX_REQUESTS_PER_HOST.
+HTTP_POOL_MAXSIZE = MAX_REQUESTS_PER_HOST
+
+# On-disk HTTP cache (data/http_cache)
+HTTP_CACHE_ENABLED = True
+# How long a cached page is used without asking the server again, per URL class.
+# After that it's revalidated with If-None-Match / If-Modified-Since.
+HTTP_CACHE_TTL_SECONDS = {
+    "search": 0,  # the search page is what tells us about new listings
+    "detail": 60 * 60,  # Booli /annons/ pages
+    "broker": 24 * 60 * 60,  # Svenskfast & other broker pages
+}
+# Total size of cached bodies; least recently used pages are evicted first.
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Incremental scraping
+# Reuse last run's ListingDetail when the list card hasn't changed.
+INCREMENTAL_ENRICHMENT = True
+# Re-enrich anyway once a stored detail is older than this (None = never).
+DETAIL_MAX_AGE_SECONDS = 24 * 60 * 60
+
+# HTML parsing backend:
+#   "html.parser" - BeautifulSoup with the stdlib parser (slowest, no deps)
+#   "lxml"        - BeautifulSoup on top of lxml
+#   "lxml-raw"    - plain lxml.html trees + CSS selectors (fastest, needs cssselect)
+HTML_PARSER = "lxml"
+
+# Search crawl (follows Booli's ?page=N pagination)
+MAX_SEARCH_PAGES = 20
+MAX_SEARCH_RESULTS = None  # stop after this many listings (None = all)
+
+# Storage backend for listings + seen IDs:
+#   "json"   - data/latest_listings.json (pretty-printed) + data/seen_ids.json
+#   "jsonl"  - data/latest_listings.jsonl, one compact listing per line,
+#              streamed on write and read
+#   "sqlite" - data/listings.sqlite3 (WAL, so the website can read mid-scrape)
+STORAGE_BACKEND = "json"
+
+# Watch mode (python -m real_estate.main --watch)
+# Each search gets its own poll interval, adapted to how often it turns up
+# new/changed listings, kept within [min, max] and randomised by +-jitter.
+WATCH_MIN_INTERVAL_SECONDS = 5 * 60
+WATCH_MAX_INTERVAL_SECONDS = 2 * 60 * 60
+WATCH_INITIAL_INTERVAL_SECONDS = 15 * 60
+WATCH_JITTER = 0.1
+# Aim for about this many new/changed listings per poll of a search.
+WATCH_TARGET_CHANGES_PER_POLL = 1.0
+# Weight of the latest cycle in the smoothed change rate (0..1).
+WATCH_RATE_SMOOTHING = 0.3
+
+# Read API for the website (python -m real_estate.main --serve)
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+# How many distinct query responses to keep ready per listing snapshot
+API_QUERY_CACHE_SIZE = 256
+
+# Per-stage latency histograms and counters (see metrics.py); main prints
+# a summary and can export them with --metrics-out.
+METRICS_ENABLED = True
+
+# Broker name/phone/email per broker page URL (see broker_cache.py)
+BROKER_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+BROKER_CACHE_MAX_ENTRIES = 5000
+
+# Per-area / per-city market statistics (see market_stats.py)
+# Quantiles estimated for price per m², fee and days on market.
+MARKET_STATS_QUANTILES = (0.25, 0.5, 0.75)
+# Each statistic keeps its values (exact quantiles) until it has this many,
+# then switches to P² sketches seeded from them (5 numbers per quantile).
+MARKET_STATS_EXACT_UNTIL = 100
+# A listing is "cheap for its area" at or below this price-per-m² quantile
+# (one of the above) of its area, once the area has enough listings.
+CHEAP_QUANTILE = 0.25
+CHEAP_MIN_LISTINGS = 5
+# A listing has left the market (and its days on market are counted) after
+# this many runs in a row in which a completed search no longer had it.
+MARKET_STATS_GONE_AFTER_RUNS = 2
+# A closed listing that shows up again within this many days (say, it was
+# closed by a bad crawl) is reopened; after that it's a relisting and is
+# not counted again.
+MARKET_STATS_REOPEN_DAYS = 14
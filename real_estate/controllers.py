@@ -1,44 +1,247 @@
 # real_estate/controllers.py
 
-from typing import List
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
 from .config import (
-    SEARCH_URL,
-    MAX_PRICE_SEK,
-    MIN_LIVING_AREA_M2,
-    MAX_MONTHLY_FEE_SEK,
+    SEARCHES,
+    DETAIL_WORKERS,
+    ENRICH_MODE,
+    INCREMENTAL_ENRICHMENT,
+    MAX_SEARCH_PAGES,
 )
+from .broker_cache import get_broker_cache
+from .calendar_feed import get_viewings_feed
+from .changes import ChangeEvent, get_change_log
+from .filters import default_profiles
+from .http_client import flush_cache
+from .incremental import reusable_detail, stamp
+from .market_stats import get_market_stats
+from .metrics import timed
 from .models import ListingDetail, ListingSummary
-from .scraper_list import parse_list_page
+from .scraper_list import SearchCoverage, iter_searches
 from .scraper_detail import enrich_with_detail
-from .storage import save_listings, load_seen_ids, save_seen_ids
+from .storage import save_listings, load_listings, load_seen_ids, save_seen_ids
+
+# Counts from the last get_interesting_apartments() call, for main's summary.
+LAST_RUN: Dict[str, int] = {"enriched": 0, "reused": 0, "failed": 0}
+# Change log events recorded by the last get_interesting_apartments() call.
+LAST_CHANGES: List[ChangeEvent] = []
 
 
 def is_interesting(summary: ListingSummary) -> bool:
-    if summary.price_sek and summary.price_sek > MAX_PRICE_SEK:
-        return False
-    if summary.living_area_m2 and summary.living_area_m2 < MIN_LIVING_AREA_M2:
-        return False
-    if (
-        summary.monthly_fee_sek is not None
-        and summary.monthly_fee_sek > MAX_MONTHLY_FEE_SEK
-    ):
-        return False
-    return True
-
-
-def get_interesting_apartments() -> List[ListingDetail]:
-    summaries = parse_list_page(SEARCH_URL)
-    filtered = [s for s in summaries if is_interesting(s)]
-    details: List[ListingDetail] = [enrich_with_detail(s) for s in filtered]
+    """
+    True if the listing matches at least one of the FILTER_PROFILES.
+    """
+    return bool(default_profiles().matches(summary))
 
-    # persist for later use
+
+def filter_interesting(
+    summaries: Iterable[ListingSummary],
+) -> Iterator[Tuple[ListingSummary, List[str]]]:
+    """
+    Yield (summary, matched profile names) for every summary that matches
+    at least one profile, as soon as it comes in.
+    """
+    profiles = default_profiles()
+    for summary in summaries:
+        names = profiles.matches(summary)
+        if names:
+            yield summary, names
+
+
+def enrich_all(
+    summaries: Iterable[ListingSummary],
+    workers: Optional[int] = None,
+) -> Tuple[List[ListingDetail], List[Tuple[ListingSummary, Exception]]]:
+    """
+    Run enrich_with_detail over all summaries, `workers` at a time.
+    `summaries` may be a generator: each one is submitted as soon as it is
+    yielded, so enrichment overlaps with producing the rest.
+    Returns (details, failures): details keep the order of `summaries`
+    (minus the ones that failed), failures are (summary, error) pairs.
+    With ENRICH_MODE = "pipeline", `workers` threads only fetch and the
+    pages are parsed in a process pool (see pipeline.py).
+    """
+    if workers is None:
+        workers = DETAIL_WORKERS
+    if ENRICH_MODE == "pipeline":
+        from .pipeline import enrich_pipeline
+
+        return enrich_pipeline(summaries, io_workers=workers)
+
+    def run_one(summary: ListingSummary):
+        try:
+            with timed("enrich"):
+                return enrich_with_detail(summary)
+        except Exception as exc:
+            return exc
+
+    if workers <= 1:
+        results = [(s, run_one(s)) for s in summaries]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            jobs = [(s, pool.submit(run_one, s)) for s in summaries]
+            # collected in submission order, whatever order they finish in
+            results = [(s, job.result()) for s, job in jobs]
+
+    details: List[ListingDetail] = []
+    failures: List[Tuple[ListingSummary, Exception]] = []
+    for summary, result in results:
+        if isinstance(result, Exception):
+            failures.append((summary, result))
+        else:
+            details.append(result)
+    return details, failures
+
+
+def collect_apartments(
+    searches: Mapping[str, str],
+    previous: Mapping[int, ListingDetail],
+    max_pages: Optional[int] = MAX_SEARCH_PAGES,
+    coverage: Optional[SearchCoverage] = None,
+) -> List[ListingDetail]:
+    """
+    Crawl `searches`, filter, and enrich each distinct listing once.
+    `previous` is the last known listing set. With INCREMENTAL_ENRICHMENT,
+    listings whose card is unchanged get their previous detail object back
+    as-is (so `previous[id] is detail` means "unchanged").
+    Each search is crawled for at most `max_pages` pages (None = all);
+    `coverage`, if given, learns which searches were crawled completely.
+    Nothing is persisted.
+    """
+    filtered: List[ListingSummary] = []
+    profiles: Dict[int, List[str]] = {}
+    by_id: Dict[int, ListingDetail] = {}
+    to_enrich: List[ListingSummary] = []
+
+    def needs_enrichment() -> Iterator[ListingSummary]:
+        # runs while the search is still being crawled
+        for s, names in filter_interesting(iter_searches(searches, max_pages=max_pages, coverage=coverage)):
+            profiles[s.booli_id] = names
+            filtered.append(s)
+            reused = None
+            if INCREMENTAL_ENRICHMENT:
+                reused = reusable_detail(s, previous.get(s.booli_id))
+            if reused is not None:
+                by_id[s.booli_id] = reused
+            else:
+                to_enrich.append(s)
+                yield s
+
+    fresh, failures = enrich_all(needs_enrichment())
+    summary_by_id = {s.booli_id: s for s in to_enrich}
+    for d in fresh:
+        by_id[d.booli_id] = stamp(d, summary_by_id[d.booli_id])
+
+    for summary, exc in failures:
+        print(
+            f"[WARN] could not enrich {summary.booli_id} ({summary.url}): {exc}",
+            file=sys.stderr,
+        )
+        # keep last run's (stale) detail rather than dropping the listing
+        if summary.booli_id in previous:
+            by_id[summary.booli_id] = previous[summary.booli_id]
+
+    now = time.time()
+    details: List[ListingDetail] = []
+    for s in filtered:
+        d = by_id.get(s.booli_id)
+        if d is None:
+            continue
+        if d.first_seen_at is None:
+            before = previous.get(s.booli_id)
+            d.first_seen_at = before.first_seen_at if before and before.first_seen_at else now
+        # these can change without the listing itself changing
+        d.profiles = profiles[s.booli_id]
+        d.searches = s.searches
+        details.append(d)
+    LAST_RUN.update(
+        enriched=len(fresh),
+        reused=len(filtered) - len(to_enrich),
+        failed=len(failures),
+    )
+    return details
+
+
+def gone_predicate(
+    coverage: SearchCoverage,
+    searched: Mapping[int, Optional[List[str]]],
+    all_searches: Iterable[str],
+) -> Callable[[int], bool]:
+    """
+    booli_id -> known to be off the market after the crawl in `coverage`
+    (see SearchCoverage.gone). `searched` has the searches each listing was
+    last found by; a listing not in it needs every one of `all_searches`.
+    """
+    names = list(all_searches)
+    return lambda booli_id: coverage.gone(booli_id, searched.get(booli_id) or names)
+
+
+def persist(
+    details: List[ListingDetail],
+    gone: Optional[Callable[[int], bool]] = None,
+) -> List[ChangeEvent]:
+    """
+    Store the current listing set, log what changed since the last one,
+    update the market stats, refresh the viewings feed and add the IDs to
+    the seen set. Returns the change events. `gone` (see gone_predicate)
+    says which listings missing from `details` have left the market;
+    without it, all of them have.
+    """
     save_listings(details)
+    changes = get_change_log().record(details, gone=gone)
+    stats = get_market_stats()
+    stats.record(details, gone=gone)
+    stats.flush()
+    flush_cache()
+    get_broker_cache().flush()
+    get_viewings_feed().write(details)
 
     # also update seen IDs
     previous_seen = load_seen_ids()
     all_ids = previous_seen.union({d.booli_id for d in details})
     save_seen_ids(all_ids)
+    return changes
 
-    return details
 
+def get_interesting_apartments(
+    searches: Optional[Mapping[str, str]] = None,
+    max_pages: Optional[int] = MAX_SEARCH_PAGES,
+) -> List[ListingDetail]:
+    """
+    Crawl all `searches` (default: config.SEARCHES), filter, enrich each
+    distinct listing once, persist and return the details.
+    Listings from the last run that a search may just not have reached
+    this time (it failed or hit a limit) are kept as they were.
+    """
+    if searches is None:
+        searches = SEARCHES
+
+    previous = {d.booli_id: d for d in load_listings()}
+
+    coverage = SearchCoverage()
+    details = collect_apartments(searches, previous, max_pages=max_pages, coverage=coverage)
+
+    gone = gone_predicate(coverage, {i: d.searches for i, d in previous.items()}, searches)
+    incomplete = [name for name in searches if name not in coverage.complete]
+    if incomplete:
+        found = {d.booli_id for d in details}
+        kept = [
+            d for booli_id, d in previous.items()
+            if booli_id not in found
+            and booli_id not in coverage.returned  # else it no longer matches a profile
+            and not gone(booli_id)
+        ]
+        print(
+            f"[WARN] incomplete search(es) {', '.join(map(repr, incomplete))}: "
+            f"keeping {len(kept)} listing(s) from the last run",
+            file=sys.stderr,
+        )
+        details = details + kept
+
+    # persist for later use
+    LAST_CHANGES[:] = persist(details, gone)
+    return details
@@ -0,0 +1,83 @@
+# real_estate/extraction.py
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence
+
+
+def _strip(value: str) -> str:
+    return value.strip()
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """
+    One value to pull out of a page's flattened text.
+
+    `pattern` is searched for in the text; `group` is the part of the
+    first match that is kept (0 = all of it). `many=True` collects every
+    non-overlapping match into a list, like re.finditer.
+    """
+
+    name: str
+    pattern: str
+    convert: Callable[[str], Any] = _strip
+    group: int = 1
+    many: bool = False
+    flags: int = 0
+
+
+@dataclass(frozen=True)
+class LinkSpec:
+    """
+    href of the first <a href> whose text contains `text`.
+    """
+
+    name: str
+    text: str
+
+
+class Extractor:
+    """
+    Compiled set of FieldSpecs/LinkSpecs: one precompiled search per text
+    field. Build these once at import time.
+    """
+
+    def __init__(self, fields: Sequence[FieldSpec], links: Sequence[LinkSpec] = ()):
+        self.fields = list(fields)
+        self.links = list(links)
+        self._compiled = [(f, re.compile(f.pattern, f.flags)) for f in self.fields]
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """
+        Single fields that never match are left out of the result; `many`
+        fields are always present as a (maybe empty) list.
+        """
+        values: Dict[str, Any] = {}
+        for f, pattern in self._compiled:
+            if f.many:
+                values[f.name] = [f.convert(m.group(f.group)) for m in pattern.finditer(text)]
+                continue
+            m = pattern.search(text)
+            if m is not None:
+                values[f.name] = f.convert(m.group(f.group))
+        return values
+
+    def extract_links(self, doc, text: str) -> Dict[str, str]:
+        """
+        Resolve the LinkSpecs against a parsed page. `text` is the page's
+        flattened text; links whose label isn't in it are skipped without
+        walking the document.
+        """
+        wanted: List[LinkSpec] = [l for l in self.links if l.text in text]
+        found: Dict[str, str] = {}
+        if not wanted:
+            return found
+        for a in doc.find_all("a", href=True):
+            link_text = a.get_text(" ", strip=True)
+            for spec in wanted:
+                if spec.name not in found and spec.text in link_text:
+                    found[spec.name] = a["href"]
+            if len(found) == len(wanted):
+                break
+        return found
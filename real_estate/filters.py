@@ -0,0 +1,141 @@
+# real_estate/filters.py
+
+import re
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .config import FILTER_PROFILES
+from .models import ListingDetail, ListingSummary
+
+Listing = Union[ListingSummary, ListingDetail]
+
+FLOOR_RE = re.compile(r"(-?\d+)")
+
+
+@dataclass(frozen=True)
+class FilterProfile:
+    """
+    One buyer's requirements. None / False means "don't care".
+    """
+
+    name: str
+    max_price_sek: Optional[int] = None
+    min_living_area_m2: Optional[float] = None
+    max_monthly_fee_sek: Optional[int] = None
+    min_rooms: Optional[float] = None
+    max_rooms: Optional[float] = None
+    min_floor: Optional[int] = None
+    require_elevator: bool = False
+    require_balcony: bool = False
+    require_outdoor_space: bool = False
+
+
+def _floor_number(floor_text: Optional[str]) -> Optional[int]:
+    # "vån 2" -> 2, "vån -1" -> -1
+    if not floor_text:
+        return None
+    m = FLOOR_RE.search(floor_text)
+    return int(m.group(1)) if m else None
+
+
+# --- columns & predicates ---
+# A predicate is one profile key with its threshold, checked against one
+# listing value (column). Profiles that share a predicate share its result.
+
+COLUMNS: Dict[str, Callable[[Listing], object]] = {
+    "price_sek": attrgetter("price_sek"),
+    "living_area_m2": attrgetter("living_area_m2"),
+    "monthly_fee_sek": attrgetter("monthly_fee_sek"),
+    "rooms": attrgetter("rooms"),
+    "floor": lambda l: _floor_number(l.floor_text),
+    "has_elevator": attrgetter("has_elevator"),
+    "has_balcony": attrgetter("has_balcony"),
+    "has_outdoor_space": attrgetter("has_outdoor_space"),
+}
+
+# (column, test) per profile key; same rules as the old is_interesting:
+# a missing (or 0) price/area/rooms never rules a listing out.
+RULES: Dict[str, Tuple[str, Callable[[object, object], bool]]] = {
+    "max_price_sek": ("price_sek", lambda v, t: not v or v <= t),
+    "min_living_area_m2": ("living_area_m2", lambda v, t: not v or v >= t),
+    "max_monthly_fee_sek": ("monthly_fee_sek", lambda v, t: v is None or v <= t),
+    "min_rooms": ("rooms", lambda v, t: not v or v >= t),
+    "max_rooms": ("rooms", lambda v, t: not v or v <= t),
+    "min_floor": ("floor", lambda v, t: v is None or v >= t),
+    "require_elevator": ("has_elevator", lambda v, t: v is True),
+    "require_balcony": ("has_balcony", lambda v, t: v is True),
+    "require_outdoor_space": ("has_outdoor_space", lambda v, t: v is True),
+}
+
+Predicate = Tuple[str, object]  # (profile key, threshold)
+
+
+def _profile_predicates(profile: FilterProfile) -> List[Predicate]:
+    preds: List[Predicate] = []
+    for f in fields(FilterProfile):
+        if f.name == "name":
+            continue
+        value = getattr(profile, f.name)
+        if value is None or value is False:
+            continue
+        preds.append((f.name, value))
+    return preds
+
+
+class ProfileSet:
+    """
+    Profiles compiled once into a shared list of predicates. matches()
+    reads each needed column of a listing once, checks each distinct
+    predicate at most once (however many profiles use it) and stops a
+    profile at its first failing predicate.
+    """
+
+    def __init__(self, profiles: Sequence[FilterProfile]):
+        self.profiles = list(profiles)
+        profile_preds = [_profile_predicates(p) for p in self.profiles]
+        predicates = sorted({p for preds in profile_preds for p in preds}, key=repr)
+        columns = sorted({RULES[key][0] for key, _ in predicates})
+        self._getters = [COLUMNS[c] for c in columns]
+        # per predicate: (column index, test, threshold)
+        self._checks = [(columns.index(RULES[key][0]), RULES[key][1], t) for key, t in predicates]
+        # per profile: (name, indexes of its predicates)
+        self._profiles = [
+            (p.name, tuple(predicates.index(pred) for pred in preds))
+            for p, preds in zip(self.profiles, profile_preds)
+        ]
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Mapping[str, object]] = FILTER_PROFILES) -> "ProfileSet":
+        return cls([FilterProfile(name=name, **spec) for name, spec in config.items()])
+
+    def matches(self, listing: Listing) -> List[str]:
+        """
+        Names of the profiles `listing` matches.
+        """
+        values = [get(listing) for get in self._getters]
+        checks = self._checks
+        passed: List[Optional[bool]] = [None] * len(checks)
+        names: List[str] = []
+        for name, preds in self._profiles:
+            for i in preds:
+                ok = passed[i]
+                if ok is None:
+                    column, test, threshold = checks[i]
+                    ok = passed[i] = test(values[column], threshold)
+                if not ok:
+                    break
+            else:
+                names.append(name)
+        return names
+
+
+_default: Optional[ProfileSet] = None
+
+
+def default_profiles() -> ProfileSet:
+    global _default
+    if _default is None:
+        _default = ProfileSet.from_config()
+    return _default
+
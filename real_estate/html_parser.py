@@ -0,0 +1,150 @@
+# real_estate/html_parser.py
+
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from .config import HTML_PARSER
+from .metrics import observe
+
+BACKENDS = ("html.parser", "lxml", "lxml-raw")
+
+# Only build the listing cards of a Booli search page.
+LIST_CARDS = SoupStrainer("div", class_="object-card-layout__content")
+
+# text inside these never shows up in BeautifulSoup's get_text()
+_SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+_stats = {"pages": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+class LxmlNode:
+    """
+    Thin wrapper around an lxml.html element with the small part of the
+    BeautifulSoup API the scrapers use: select, select_one, find_all,
+    get_text, ["attr"] and .get("attr").
+    """
+
+    __slots__ = ("el",)
+
+    _xpaths: Dict[str, object] = {}
+
+    def __init__(self, el):
+        self.el = el
+
+    @classmethod
+    def _xpath(cls, css: str):
+        xp = cls._xpaths.get(css)
+        if xp is None:
+            try:
+                from cssselect import HTMLTranslator
+            except ImportError as exc:
+                raise ImportError(
+                    "HTML_PARSER = 'lxml-raw' needs the cssselect package"
+                ) from exc
+            from lxml import etree
+
+            # descendants only, like BeautifulSoup's Tag.select()
+            xp = etree.XPath(HTMLTranslator().css_to_xpath(css, prefix="descendant::"))
+            cls._xpaths[css] = xp
+        return xp
+
+    def select(self, css: str) -> List["LxmlNode"]:
+        return [LxmlNode(el) for el in self._xpath(css)(self.el)]
+
+    def select_one(self, css: str) -> Optional["LxmlNode"]:
+        found = self._xpath(css)(self.el)
+        return LxmlNode(found[0]) if found else None
+
+    def find_all(self, name: str, **attrs) -> List["LxmlNode"]:
+        """
+        find_all("a", href=True) style lookups: attribute values may be
+        True (attribute present) or an exact string.
+        """
+        conditions = []
+        for attr, value in attrs.items():
+            if value is True:
+                conditions.append(f"[@{attr}]")
+            else:
+                conditions.append(f"[@{attr}={value!r}]")
+        return [LxmlNode(el) for el in self.el.iterfind(f".//{name}" + "".join(conditions))]
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        strings: List[str] = []
+        _collect_text(self.el, strings, with_tail=False)
+        if strip:
+            strings = [s.strip() for s in strings]
+            strings = [s for s in strings if s]
+        return separator.join(strings)
+
+    def get(self, attr: str, default=None):
+        return self.el.get(attr, default)
+
+    def __getitem__(self, attr: str) -> str:
+        value = self.el.get(attr)
+        if value is None:
+            raise KeyError(attr)
+        return value
+
+
+def _collect_text(el, out: List[str], with_tail: bool) -> None:
+    tag = el.tag
+    # comments / processing instructions have a non-str tag
+    if isinstance(tag, str) and tag not in _SKIP_TEXT_TAGS:
+        if el.text:
+            out.append(el.text)
+        for child in el:
+            _collect_text(child, out, with_tail=True)
+    if with_tail and el.tail:
+        out.append(el.tail)
+
+
+Document = Union[BeautifulSoup, LxmlNode]
+
+
+def make_soup(
+    html: str,
+    parse_only: Optional[SoupStrainer] = None,
+    backend: Optional[str] = None,
+) -> Document:
+    """
+    Parse `html` with the configured backend.
+    `parse_only` limits the bs4 backends to matching subtrees; the raw lxml
+    backend always parses the whole page (it's fast enough not to matter).
+    """
+    backend = backend or HTML_PARSER
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown HTML_PARSER {backend!r}, pick one of {BACKENDS}")
+
+    started = time.perf_counter()
+    if backend == "lxml-raw":
+        import lxml.html
+
+        if not html.strip():
+            html = "<html></html>"
+        try:
+            root = lxml.html.document_fromstring(html)
+        except ValueError:
+            # str input with an <?xml encoding=...?> declaration
+            root = lxml.html.document_fromstring(html.encode("utf-8"))
+        doc: Document = LxmlNode(root)
+    else:
+        doc = BeautifulSoup(html, backend, parse_only=parse_only)
+
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        _stats["pages"] += 1
+        _stats["seconds"] += elapsed
+    observe("parse", 1000 * elapsed, backend=backend)
+    return doc
+
+
+def parse_stats() -> Dict[str, float]:
+    """
+    Pages parsed and total parse time (ms) in this run.
+    """
+    with _stats_lock:
+        return {"pages": _stats["pages"], "ms": round(1000 * _stats["seconds"], 1)}
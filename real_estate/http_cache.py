@@ -0,0 +1,210 @@
+# real_estate/http_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from .config import HTTP_CACHE_TTL_SECONDS, HTTP_CACHE_MAX_BYTES
+from .storage import DATA_DIR
+
+CACHE_DIR = DATA_DIR / "http_cache"
+INDEX_NAME = "index.json"
+
+
+def url_class(url: str) -> str:
+    """
+    'search' for Booli search pages, 'detail' for Booli listing pages,
+    'broker' for everything else (Svenskfast etc).
+    """
+    path = urlsplit(url).path
+    if "/sok/" in path:
+        return "search"
+    if "/annons/" in path:
+        return "detail"
+    return "broker"
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    filename: str
+    size: int
+    stored_at: float  # last time the server confirmed this body (200 or 304)
+    last_used: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class HttpCache:
+    """
+    Response bodies on disk, one file per URL, plus an index.json with the
+    validators and timestamps. Evicts least recently used bodies once the
+    total size goes over `max_bytes`.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._entries: Optional[Dict[str, CacheEntry]] = None
+        self._total = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    # --- index ---
+
+    def _index(self) -> Dict[str, CacheEntry]:
+        if self._entries is None:
+            entries: Dict[str, CacheEntry] = {}
+            index_path = self.directory / INDEX_NAME
+            if index_path.exists():
+                try:
+                    with index_path.open("r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                    for item in raw:
+                        entry = CacheEntry(**item)
+                        if (self.directory / entry.filename).exists():
+                            entries[entry.url] = entry
+                except (ValueError, TypeError):
+                    entries = {}  # corrupt index: start over
+            self._entries = entries
+            self._total = sum(e.size for e in entries.values())
+        return self._entries
+
+    def flush(self) -> None:
+        """
+        Write the index to disk if anything changed.
+        """
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            index_path = self.directory / INDEX_NAME
+            tmp = index_path.with_suffix(".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump([asdict(e) for e in self._entries.values()], f, ensure_ascii=False)
+            os.replace(tmp, index_path)
+            self._dirty = False
+
+    # --- lookups ---
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            return self._index().get(url)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        ttl = HTTP_CACHE_TTL_SECONDS.get(url_class(entry.url), 0)
+        return time.time() - entry.stored_at < ttl
+
+    def read(self, entry: CacheEntry) -> Optional[str]:
+        """
+        Body of a cached entry, or None if the file has gone missing.
+        Marks the entry as recently used.
+        """
+        try:
+            body = (self.directory / entry.filename).read_text(encoding="utf-8")
+        except OSError:
+            with self._lock:
+                self._drop(entry.url)
+            return None
+        with self._lock:
+            entry.last_used = time.time()
+            self._dirty = True
+        return body
+
+    def confirm(self, entry: CacheEntry) -> None:
+        """
+        Server answered 304: the cached body is good for another TTL.
+        """
+        with self._lock:
+            entry.stored_at = time.time()
+            self._dirty = True
+
+    # --- writes ---
+
+    def store(
+        self,
+        url: str,
+        body: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        filename = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html"
+        data = body.encode("utf-8")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / (filename + f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self.directory / filename)
+
+        now = time.time()
+        with self._lock:
+            index = self._index()
+            old = index.get(url)
+            if old is not None:
+                self._total -= old.size
+            index[url] = CacheEntry(
+                url=url,
+                filename=filename,
+                size=len(data),
+                stored_at=now,
+                last_used=now,
+                etag=etag,
+                last_modified=last_modified,
+            )
+            self._total += len(data)
+            self._dirty = True
+            self._evict()
+
+    def _drop(self, url: str) -> None:
+        entry = self._index().pop(url, None)
+        if entry is None:
+            return
+        self._total -= entry.size
+        self._dirty = True
+        try:
+            (self.directory / entry.filename).unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        for entry in sorted(self._index().values(), key=lambda e: e.last_used):
+            if self._total <= self.max_bytes:
+                break
+            self._drop(entry.url)
+
+    def record(self, outcome: str) -> None:
+        """
+        Count one 'hits' / 'misses' / 'revalidated' for this run.
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+        }
+
+
+_cache: Optional[HttpCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> HttpCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache()
+    return _cache
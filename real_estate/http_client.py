@@ -1,12 +1,354 @@
 # real_estate/http_client.py  (optional but nice)
 
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
 import requests
-from bs4 import BeautifulSoup
-from .config import USER_AGENT, REQUEST_TIMEOUT
+from bs4 import SoupStrainer
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    USER_AGENT,
+    REQUEST_TIMEOUT,
+    MAX_REQUESTS_PER_HOST,
+    HTTP_POOL_HOSTS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_CACHE_ENABLED,
+    HTTP_RESILIENCE,
+    HEDGE_URL_CLASSES,
+    DETAIL_WORKERS,
+)
+from .html_parser import Document, make_soup
+from .http_cache import get_cache, url_class
+from .metrics import count, timed
+from .resilience import HostGuard, get_host_guard, guard_stats, retry_after_seconds
+
+
+def _accept_encoding() -> str:
+    # urllib3 only decodes brotli if one of these is installed
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+        except ImportError:
+            return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept-Encoding": _accept_encoding(),
+    "Connection": "keep-alive",
+}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_host_slots_lock = threading.Lock()
+
+# When set, fetch_text(url) returns _fetch_stub(url) instead of touching the
+# network or the cache (benchmarks serve saved pages from disk this way).
+_fetch_stub: Optional[Callable[[str], str]] = None
+
+# host -> {"requests": n, "ttfb_total": seconds}
+_ttfb: Dict[str, Dict[str, float]] = {}
+_ttfb_lock = threading.Lock()
+
+# runs the attempts of hedged fetches (see _send_hedged)
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    The one shared Session for the whole process. Its connection pools are
+    per host and keep connections alive between list, detail and broker
+    pages. urllib3's pools are thread-safe, so workers can share it.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_HOSTS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=False,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(HEADERS)
+                _session = session
+    return _session
+
+
+@contextmanager
+def host_slot(url: str) -> Iterator[None]:
+    """
+    Hold one of the MAX_REQUESTS_PER_HOST slots for the host of `url`,
+    so concurrent enrichment doesn't hammer booli.se / svenskfast.se.
+    """
+    host = urlsplit(url).netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(max(1, MAX_REQUESTS_PER_HOST))
+            _host_slots[host] = slot
+    with slot:
+        yield
+
+
+def _send(
+    url: str,
+    headers: Optional[Dict[str, str]],
+    timeout: float,
+    guard: Optional[HostGuard] = None,
+) -> requests.Response:
+    """
+    One GET, in a host slot, with the per-host bookkeeping. `guard` gets
+    its say once the slot is ours, so requests queued for a slot don't go
+    out after the host's circuit has opened, and hears how every request
+    it let through went (429 and 5xx count as failures).
+    """
+    host = urlsplit(url).netloc.lower()
+    with host_slot(url):
+        probe = guard.before_request() if guard is not None else False
+        try:
+            with timed("http_get", host=host):
+                resp = get_session().get(url, headers=headers, timeout=timeout)
+        except Exception as exc:
+            if guard is not None:
+                # a timeout took at least `timeout`; other errors say nothing about latency
+                guard.record(False, timeout if isinstance(exc, requests.Timeout) else None, probe)
+            raise
+    if guard is not None:
+        failed = resp.status_code == 429 or resp.status_code >= 500
+        guard.record(not failed, resp.elapsed.total_seconds(), probe)
+
+    count("http_requests", host=host, status=resp.status_code)
+    count("http_bytes", len(resp.content), host=host)
+    if resp.status_code >= 400:
+        count("http_errors", host=host)
+    with _ttfb_lock:
+        entry = _ttfb.setdefault(host, {"requests": 0, "ttfb_total": 0.0})
+        entry["requests"] += 1
+        # requests measures elapsed up to the response headers
+        entry["ttfb_total"] += resp.elapsed.total_seconds()
+    return resp
+
+
+def _get(url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+    GET `url`. With HTTP_RESILIENCE the host's HostGuard sets the timeout,
+    may refuse the request (HostUnavailable: circuit open), and decides
+    whether a timeout, connection error, 429 or 5xx is retried and after
+    how long. When retries run out the last error is raised, or the last
+    error response returned, as without retries.
+    """
+    if not HTTP_RESILIENCE:
+        return _send(url, headers, REQUEST_TIMEOUT)
+
+    guard = get_host_guard(urlsplit(url).netloc.lower())
+    hedge = url_class(url) in HEDGE_URL_CLASSES
+    attempt = 0
+    while True:
+        timeout = guard.timeout()
+        try:
+            if hedge:
+                resp = _send_hedged(url, headers, guard, timeout)
+            else:
+                resp = _send(url, headers, timeout, guard)
+        except (requests.ConnectionError, requests.Timeout):
+            attempt += 1
+            delay = guard.retry_delay(attempt)
+            if delay is None:
+                raise
+        else:
+            if resp.status_code != 429 and resp.status_code < 500:
+                return resp
+            retry_after = retry_after_seconds(resp.headers.get("Retry-After"))
+            if resp.status_code == 429 and retry_after:
+                guard.pause(retry_after)  # holds the other workers too
+            attempt += 1
+            delay = guard.retry_delay(attempt, retry_after)
+            if delay is None:
+                return resp
+            resp.close()
+        time.sleep(delay)
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    if _hedge_pool is None:
+        with _hedge_pool_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(
+                    2 * max(DETAIL_WORKERS, MAX_REQUESTS_PER_HOST), thread_name_prefix="hedge"
+                )
+    return _hedge_pool
 
-HEADERS = {"User-Agent": USER_AGENT}
 
-def fetch_soup(url: str) -> BeautifulSoup:
-    resp = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
+def _send_hedged(
+    url: str,
+    headers: Optional[Dict[str, str]],
+    guard: HostGuard,
+    timeout: float,
+) -> requests.Response:
+    """
+    _send(), plus a second identical request if the first hasn't answered
+    within the host's hedge delay (its recent p95). The first answer wins;
+    if that's an error, the other request still gets its chance.
+    """
+    delay = guard.hedge_delay()
+    if delay is None:
+        return _send(url, headers, timeout, guard)
+    pool = _get_hedge_pool()
+    first = pool.submit(_send, url, headers, timeout, guard)
+    if wait([first], timeout=delay).done:
+        return first.result()
+    guard.hedged()
+    second = pool.submit(_send, url, headers, timeout, guard)
+    done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+    winner = first if first in done else second
+    loser = second if winner is first else first
+    if winner.exception() is not None:
+        return loser.result()
+    loser.add_done_callback(_discard)
+    return winner.result()
+
+
+def _discard(attempt: "Future[requests.Response]") -> None:
+    if attempt.exception() is None:
+        attempt.result().close()
+
+
+def fetch_text(url: str) -> str:
+    """
+    GET `url` through the shared session and return the decoded body.
+    With HTTP_CACHE_ENABLED, fresh cached pages are returned without a
+    request and stale ones are revalidated with their ETag/Last-Modified.
+    """
+    with timed("fetch", kind=url_class(url)):
+        return _fetch_text(url)
+
+
+def _fetch_text(url: str) -> str:
+    if _fetch_stub is not None:
+        return _fetch_stub(url)
+
+    if not HTTP_CACHE_ENABLED:
+        resp = _get(url)
+        resp.raise_for_status()
+        return resp.text
+
+    cache = get_cache()
+    entry = cache.get(url)
+    conditional: Dict[str, str] = {}
+    if entry is not None:
+        if cache.is_fresh(entry):
+            body = cache.read(entry)
+            if body is not None:
+                cache.record("hits")
+                return body
+        if entry.etag:
+            conditional["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            conditional["If-Modified-Since"] = entry.last_modified
+
+    resp = _get(url, headers=conditional or None)
+    if resp.status_code == 304 and entry is not None:
+        body = cache.read(entry)
+        if body is not None:
+            cache.confirm(entry)
+            cache.record("revalidated")
+            return body
+        # body vanished from disk under us: fetch it again unconditionally
+        resp = _get(url)
+
     resp.raise_for_status()
-    return BeautifulSoup(resp.text, "html.parser")
+    cache.record("misses")
+    body = resp.text
+    cache.store(
+        url,
+        body,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+    )
+    return body
+
+
+def set_fetch_stub(
+    stub: Optional[Callable[[str], str]],
+) -> Optional[Callable[[str], str]]:
+    """
+    Route every fetch_text(url) through `stub(url) -> body` (None restores
+    the network). Returns the previous stub.
+    """
+    global _fetch_stub
+    previous, _fetch_stub = _fetch_stub, stub
+    return previous
+
+
+def cache_stats() -> Dict[str, int]:
+    """
+    Hit / miss / revalidated counts of the HTTP cache for this run.
+    """
+    return get_cache().stats()
+
+
+def flush_cache() -> None:
+    if HTTP_CACHE_ENABLED:
+        get_cache().flush()
+
+
+def fetch_soup(url: str, parse_only: Optional[SoupStrainer] = None) -> Document:
+    """
+    Fetch `url` and parse it with the configured HTML_PARSER backend.
+    """
+    return make_soup(fetch_text(url), parse_only=parse_only)
+
+
+def http_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-host numbers for this run:
+      {host: {requests, connections, avg_ttfb_ms}}
+    `connections` is how many TCP(+TLS) connections urllib3 opened,
+    i.e. the handshake count.
+    """
+    stats: Dict[str, Dict[str, float]] = {}
+    with _ttfb_lock:
+        for host, entry in _ttfb.items():
+            n = entry["requests"]
+            stats[host] = {
+                "requests": n,
+                "connections": 0,
+                "avg_ttfb_ms": round(1000 * entry["ttfb_total"] / n, 1) if n else 0.0,
+            }
+
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+                entry = stats.setdefault(
+                    host, {"requests": 0, "connections": 0, "avg_ttfb_ms": 0.0}
+                )
+                entry["connections"] += pool.num_connections
+    return stats
+
+
+def resilience_stats() -> Dict[str, Dict[str, object]]:
+    """
+    Per-host resilience state (see resilience.HostGuard.stats):
+      {host: {state, timeout_s, p50_ms, p99_ms, retries, hedges, short_circuited, opened}}
+    """
+    return guard_stats()
@@ -1,45 +1,211 @@
 # real_estate/ics_parser.py
 
+import os
+import re
 from datetime import datetime
-from typing import Dict
+from functools import lru_cache
+from typing import IO, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+IcsSource = Union[str, "os.PathLike[str]", IO[str], Iterable[str]]
+
+# property name -> key in the returned event dict
+EVENT_FIELDS = {
+    "DTSTART": "start",
+    "DTEND": "end",
+    "DESCRIPTION": "description",
+    "URL": "url",
+    "LOCATION": "location",
+    "SUMMARY": "summary",
+    "UID": "uid",
+}
+_DATE_FIELDS = ("DTSTART", "DTEND")
+_TEXT_FIELDS = ("DESCRIPTION", "LOCATION", "SUMMARY")
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+
 
 def parse_single_ics_event(text: str) -> Dict[str, str]:
     """
-    Very simple parser for a single VEVENT .ics text.
-    Returns {start, end, description, url, location}.
-    Times are returned as ISO strings.
-    """
-    data: Dict[str, str] = {}
-
-    def get_line(name: str) -> str:
-        for line in text.splitlines():
-            if line.startswith(name + ":"):
-                return line.split(":", 1)[1].strip()
-        return ""
-
-    dtstart = get_line("DTSTART")
-    dtend = get_line("DTEND")
-    desc = get_line("DESCRIPTION")
-    url = get_line("URL")
-    location = get_line("LOCATION")
-
-    def parse_utc(dt_raw: str) -> str:
-        # Example: 20251207T123000Z -> ISO
-        try:
-            dt = datetime.strptime(dt_raw, "%Y%m%dT%H%M%SZ")
-            return dt.isoformat() + "Z"
-        except Exception:
-            return dt_raw
-
-    if dtstart:
-        data["start"] = parse_utc(dtstart)
-    if dtend:
-        data["end"] = parse_utc(dtend)
-    if desc:
-        data["description"] = desc
-    if url:
-        data["url"] = url
-    if location:
-        data["location"] = location
-
-    return data
+    Parse the first VEVENT of an .ics text (or a bare VEVENT body).
+    Returns {start, end, description, url, location} (plus summary/uid when
+    present). Times are returned as ISO strings.
+    """
+    for event in iter_ics_events(text, bare=True):
+        return event
+    return {}
+
+
+def iter_ics_events(source: IcsSource, bare: bool = False) -> Iterator[Dict[str, str]]:
+    """
+    Yield one dict per VEVENT, in a single pass over `source`: the .ics
+    text itself, a path, an open file, or any iterable of lines. Folded
+    lines (RFC 5545 3.1) are unfolded, TEXT values unescaped, and
+    DTSTART/DTEND turned into ISO strings:
+      20251207T123000Z                 -> 2025-12-07T12:30:00Z
+      TZID=Europe/Stockholm:20251207T133000 -> 2025-12-07T13:30:00+01:00
+      20251207T133000 (floating)       -> 2025-12-07T13:30:00
+      VALUE=DATE:20251207              -> 2025-12-07
+    With `bare`, properties outside any BEGIN:VEVENT count as one event.
+    """
+    event: Optional[Dict[str, str]] = None  # the VEVENT being read
+    loose: Optional[Dict[str, str]] = {} if bare else None
+    seen_event = False
+    nested = 0  # depth inside components we ignore (VALARM, VTIMEZONE, ...)
+
+    for name, params, value in _properties(_unfolded(_lines(source))):
+        if name == "BEGIN":
+            upper = value.upper()
+            if upper == "VEVENT" and not nested:
+                event = {}
+                seen_event = True
+            elif upper != "VCALENDAR":
+                nested += 1
+            continue
+        if name == "END":
+            upper = value.upper()
+            if upper == "VEVENT" and event is not None and not nested:
+                yield event
+                event = None
+            elif nested and upper != "VCALENDAR":
+                nested -= 1
+            continue
+        if nested:
+            continue
+        target = event if event is not None else loose
+        if target is None:
+            continue
+
+        key = EVENT_FIELDS.get(name)
+        if key is None or key in target:
+            continue  # first occurrence wins, like the old parser
+        if name in _DATE_FIELDS:
+            value = _iso_datetime(value, params)
+        elif name in _TEXT_FIELDS:
+            value = _unescape(value)
+        value = value.strip()
+        if value:
+            target[key] = value
+
+    if loose and not seen_event:
+        yield loose
+
+
+def _lines(source: IcsSource) -> Iterator[str]:
+    if isinstance(source, str):
+        yield from source.splitlines()
+        return
+    if isinstance(source, os.PathLike):
+        with open(source, "r", encoding="utf-8", newline="") as f:
+            yield from f
+        return
+    yield from source
+
+
+def _unfolded(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Join continuation lines (starting with a space or tab) onto the line
+    before them.
+    """
+    pending: Optional[str] = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            if pending is not None:
+                pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending is not None:
+        yield pending
+
+
+def _properties(lines: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """
+    'NAME;PARAM=x:value' -> ('NAME', 'PARAM=x', 'value'). Colons inside
+    quoted parameter values don't end the name part.
+    """
+    for line in lines:
+        colon = line.find(":")
+        if colon < 0:
+            continue
+        semi = line.find(";", 0, colon)
+        if semi < 0:
+            yield line[:colon].upper(), "", line[colon + 1:]
+            continue
+        if '"' in line[semi:colon]:
+            colon = _unquoted_colon(line, semi)
+            if colon < 0:
+                continue
+        yield line[:semi].upper(), line[semi + 1:colon], line[colon + 1:]
+
+
+def _unquoted_colon(line: str, start: int) -> int:
+    quoted = False
+    for i in range(start, len(line)):
+        ch = line[i]
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ":" and not quoted:
+            return i
+    return -1
+
+
+def _param(params: str, name: str) -> Optional[str]:
+    for part in params.split(";"):
+        key, _, value = part.partition("=")
+        if key.upper() == name:
+            return value.strip('"')
+    return None
+
+
+@lru_cache(maxsize=32)
+def _zone(tzid: str):
+    try:
+        from zoneinfo import ZoneInfo
+
+        return ZoneInfo(tzid)
+    except Exception:
+        return None  # unknown zone (or no tz database): keep local time
+
+
+def _iso_datetime(value: str, params: str) -> str:
+    """
+    Date / date-time value -> ISO string, by slicing (no strptime).
+    Anything unexpected is returned unchanged.
+    """
+    value = value.strip()
+    n = len(value)
+    if n == 8 and value.isdigit():
+        return f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+    if n not in (15, 16) or value[8] != "T" or not (value[:8] + value[9:15]).isdigit():
+        return value
+    date = f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+    clock = f"{value[9:11]}:{value[11:13]}:{value[13:15]}"
+    if n == 16:
+        return f"{date}T{clock}Z" if value[15] in "Zz" else value
+
+    tzid = _param(params, "TZID") if params else None
+    zone = _zone(tzid) if tzid else None
+    if zone is None:
+        return f"{date}T{clock}"
+    try:
+        dt = datetime(
+            int(value[0:4]), int(value[4:6]), int(value[6:8]),
+            int(value[9:11]), int(value[11:13]), int(value[13:15]),
+            tzinfo=zone,
+        )
+    except ValueError:
+        return value
+    return dt.isoformat()
+
+
+def _unescape(value: str) -> str:
+    # TEXT escapes: \\ \; \, \n \N
+    if "\\" not in value:
+        return value
+    return _ESCAPE_RE.sub(_unescape_match, value)
+
+
+def _unescape_match(m: "re.Match[str]") -> str:
+    ch = m.group(1)
+    return "\n" if ch in "nN" else ch
@@ -0,0 +1,63 @@
+# real_estate/incremental.py
+
+import hashlib
+import time
+from typing import Optional
+
+from .config import DETAIL_MAX_AGE_SECONDS
+from .models import ListingDetail, ListingSummary
+
+# Everything the list card tells us. If none of it changed, the detail
+# page almost certainly didn't either.
+FINGERPRINT_FIELDS = (
+    "url",
+    "address",
+    "price_sek",
+    "monthly_fee_sek",
+    "status_text",
+    "living_area_m2",
+    "rooms",
+    "floor_text",
+    "has_elevator",
+    "has_balcony",
+    "has_outdoor_space",
+)
+
+
+def summary_fingerprint(summary: ListingSummary) -> str:
+    """
+    Short stable hash of the list-card fields of a listing.
+    """
+    values = tuple(getattr(summary, name) for name in FINGERPRINT_FIELDS)
+    return hashlib.sha1(repr(values).encode("utf-8")).hexdigest()[:16]
+
+
+def reusable_detail(
+    summary: ListingSummary,
+    previous: Optional[ListingDetail],
+    max_age: Optional[float] = DETAIL_MAX_AGE_SECONDS,
+    now: Optional[float] = None,
+) -> Optional[ListingDetail]:
+    """
+    Return the stored detail if it can stand in for a fresh
+    enrich_with_detail(summary), else None.
+    """
+    if previous is None or previous.summary_fingerprint is None:
+        return None
+    if previous.summary_fingerprint != summary_fingerprint(summary):
+        return None
+    if max_age is not None:
+        if previous.enriched_at is None:
+            return None
+        if (now if now is not None else time.time()) - previous.enriched_at > max_age:
+            return None
+    return previous
+
+
+def stamp(detail: ListingDetail, summary: ListingSummary) -> ListingDetail:
+    """
+    Record what `detail` was built from, so the next run can reuse it.
+    """
+    detail.summary_fingerprint = summary_fingerprint(summary)
+    detail.enriched_at = time.time()
+    return detail
@@ -1,26 +1,474 @@
 # real_estate/main.py
 
-from .controllers import get_interesting_apartments
-from .storage import load_seen_ids
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
 
+from . import metrics
+from .changes import CHANGE_KINDS, get_change_log
+from .config import API_PORT, SEARCHES
+from .market_stats import get_market_stats, price_per_m2
+from .models import ListingDetail
+from .storage import iter_listings, load_seen_ids
+
+# Only the scrape command needs requests/bs4/lxml: everything that pulls
+# them in (controllers, http_client, html_parser, scraper_*) is imported
+# inside the functions that use it, so list/new-since/export start fast.
+
+
+def format_listing(a, marker: str) -> str:
+    return (
+        f"[{marker}] {a.address} ({a.area}, {a.city}) "
+        f"{a.living_area_m2} m², {a.rooms} rum, "
+        f"pris {a.price_sek} kr, avgift {a.monthly_fee_sek} kr/mån, "
+        f"vån {a.floor_text} | url: {a.url}"
+        + (f" | sök: {', '.join(a.searches or [])}" if len(SEARCHES) > 1 else "")
+        + _cheap_note(a)
+    )
+
+
+def _cheap_note(a) -> str:
+    median = get_market_stats().cheap_for_area(a)
+    if median is None:
+        return ""
+    return (
+        f" | billigt för {a.area}: {_sek(round(price_per_m2(a)))} kr/m² "
+        f"(median {_sek(round(median))})"
+    )
+
+
+def _sek(n) -> str:
+    return f"{n:,}".replace(",", " ") if isinstance(n, int) else str(n)
+
+
+def format_change(e) -> str:
+    """
+    One change log event as a line, e.g.
+      [PRICE] Ringvägen 5 (#5512345): 2 000 000 -> 1 900 000 kr (-100 000)
+    """
+    what = f"{e.address} (#{e.booli_id})"
+    if e.kind == "new":
+        return f"[NEW] {what}: {_sek(e.new)} kr"
+    if e.kind == "removed":
+        return f"[REMOVED] {what}, last at {_sek(e.old)} kr"
+    if e.kind == "status_changed":
+        return f"[STATUS] {what}: {e.old!r} -> {e.new!r}"
+    label, unit = ("PRICE", "kr") if e.kind == "price_changed" else ("FEE", "kr/mån")
+    delta = ""
+    if isinstance(e.old, int) and isinstance(e.new, int):
+        delta = f" ({'+' if e.new > e.old else '-'}{_sek(abs(e.new - e.old))})"
+    return f"[{label}] {what}: {_sek(e.old)} -> {_sek(e.new)} {unit}{delta}"
+
+
+def watch(max_cycles=None, index=None):
+    from .watch import Watcher
+
+    watcher = Watcher()
+    if index is not None:
+        index.update(watcher.state.values())
+    print(f"Watching {len(watcher.schedules)} search(es), Ctrl-C to stop.\n")
+    try:
+        watcher.run(
+            emit=lambda a: print(format_listing(a, "NEW"), flush=True),
+            log=lambda msg: print(msg, flush=True),
+            max_cycles=max_cycles,
+            on_update=index.update if index is not None else None,
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(port, watching, max_cycles=None):
+    from .api import ListingIndex, make_server, serve_in_background
+    from .storage import load_listings
+
+    index = ListingIndex()
+    server = make_server(index, port=port)
+    host, port = server.server_address[:2]
+    print(f"Serving listings on http://{host}:{port}/listings")
+    if watching:
+        serve_in_background(server)
+        watch(max_cycles, index)
+        server.shutdown()
+        return
+    index.update(load_listings())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_once():
+    from .broker_cache import get_broker_cache
+    from .calendar_feed import VIEWINGS_FEED_PATH, get_viewings_feed
+    from .config import HTML_PARSER
+    from .controllers import get_interesting_apartments, LAST_CHANGES, LAST_RUN
+    from .html_parser import parse_stats
+    from .http_client import http_stats, cache_stats, resilience_stats
 
-def main():
     before = load_seen_ids()  # IDs from previous runs
     apartments = get_interesting_apartments()
 
     print(f"Found {len(apartments)} interesting apartments:\n")
 
     for a in apartments:
-        is_new = a.booli_id not in before
-        marker = "NEW" if is_new else "OLD"
+        marker = "NEW" if a.booli_id not in before else "OLD"
+        print(format_listing(a, marker))
+
+    # NEW is already marked above
+    changed = [e for e in LAST_CHANGES if e.kind != "new"]
+    if changed:
+        print()
+        for e in changed:
+            print(format_change(e))
+
+    print()
+    kinds = {}
+    for e in LAST_CHANGES:
+        kinds[e.kind] = kinds.get(e.kind, 0) + 1
+    print("Changes: " + (", ".join(f"{n} {k}" for k, n in sorted(kinds.items())) or "none"))
+    print(
+        f"Details: {LAST_RUN['enriched']} fetched, {LAST_RUN['reused']} reused "
+        f"from last run, {LAST_RUN['failed']} failed"
+    )
+    for host, s in sorted(http_stats().items()):
+        print(
+            f"HTTP {host}: {s['requests']} requests over "
+            f"{s['connections']} connections, avg TTFB {s['avg_ttfb_ms']} ms"
+        )
+    for host, r in sorted(resilience_stats().items()):
+        p99 = f"p99 {r['p99_ms']} ms" if r["p99_ms"] is not None else "too few samples"
+        print(
+            f"Resilience {host}: timeout {r['timeout_s']} s ({p99}), {r['retries']} retries, "
+            f"{r['hedges']} hedged, circuit {r['state']} "
+            f"(opened {r['opened']}x, {r['short_circuited']} requests skipped)"
+        )
+    c = cache_stats()
+    print(
+        f"HTTP cache: {c['hits']} hits, {c['revalidated']} revalidated, "
+        f"{c['misses']} misses"
+    )
+    b = get_broker_cache().stats()
+    lookups = sum(b.values())
+    if lookups:
+        print(
+            f"Broker cache: {b['hits']} hits, {b['coalesced']} coalesced, "
+            f"{b['misses']} fetched ({(b['hits'] + b['coalesced']) / lookups:.0%} hit rate)"
+        )
+    f = get_viewings_feed().stats()
+    print(f"Viewings feed: {f['rendered']} events rendered, {f['reused']} reused -> {VIEWINGS_FEED_PATH}")
+    p = parse_stats()
+    print(f"HTML parsing ({HTML_PARSER}): {p['pages']} pages in {p['ms']} ms")
+
+    table = metrics.summary_table()
+    if table:
+        print()
+        print(table)
+
+
+def profiled(fn, top=30):
+    """
+    Run fn() under cProfile - including the worker threads it starts - and
+    print the `top` functions by own time.
+    """
+    import cProfile
+    import pstats
+    import threading
+
+    profiles = []
+
+    def start_in_thread(*_):
+        # first profiler event of a new thread: swap in a real profiler
+        sys.setprofile(None)
+        prof = cProfile.Profile()
+        profiles.append(prof)
+        prof.enable()
+
+    main_prof = cProfile.Profile()
+    threading.setprofile(start_in_thread)
+    main_prof.enable()
+    try:
+        fn()
+    finally:
+        main_prof.disable()
+        threading.setprofile(None)
+
+    stats = pstats.Stats(main_prof, stream=sys.stderr)
+    for prof in profiles:
+        stats.add(prof)
+    print(f"\nProfile ({1 + len(profiles)} threads), top {top} by own time:", file=sys.stderr)
+    stats.sort_stats("tottime").print_stats(top)
+
+
+def _first_seen(a: ListingDetail) -> str:
+    if a.first_seen_at is None:
+        return "?"
+    return datetime.fromtimestamp(a.first_seen_at).strftime("%Y-%m-%d")
+
+
+def _print_listings(listings: Iterable[ListingDetail], marker=_first_seen) -> None:
+    n = 0
+    for a in listings:
+        print(format_listing(a, marker(a)))
+        n += 1
+    print(f"\n{n} listing(s)")
+
+
+def _since(value: str) -> float:
+    """
+    argparse type for new-since: epoch seconds, an ISO date/datetime
+    (local time unless it has an offset), or an age like 36h / 7d.
+    """
+    units = {"h": 3600, "d": 86400}
+    try:
+        if value[-1:] in units:
+            return time.time() - float(value[:-1]) * units[value[-1]]
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected epoch seconds, an ISO date or an age like 7d, got {value!r}"
+        )
+
+
+def list_stored(area: Optional[str], city: Optional[str], sort: str, limit: Optional[int]) -> None:
+    listings = [
+        a for a in iter_listings()
+        if (area is None or (a.area or "").casefold() == area.casefold())
+        and (city is None or (a.city or "").casefold() == city.casefold())
+    ]
+    if sort == "price":
+        listings.sort(key=lambda a: a.price_sek)
+    elif sort == "first-seen":
+        listings.sort(key=lambda a: a.first_seen_at or 0.0, reverse=True)
+    _print_listings(listings[:limit])
+
+
+def new_since(since: float) -> None:
+    listings = [a for a in iter_listings() if (a.first_seen_at or 0.0) >= since]
+    listings.sort(key=lambda a: a.first_seen_at, reverse=True)
+    _print_listings(listings, marker=lambda a: "NEW " + _first_seen(a))
+
+
+def changes_since(since: float, kinds: Optional[List[str]]) -> None:
+    n = 0
+    for e in get_change_log().since(since, kinds):
+        print(f"{datetime.fromtimestamp(e.at):%Y-%m-%d %H:%M} {format_change(e)}")
+        n += 1
+    print(f"\n{n} change(s)")
+
+
+def price_history(booli_id: int) -> None:
+    history = get_change_log().price_history(booli_id)
+    if not history:
+        print(f"No price history for #{booli_id}")
+        return
+    previous = None
+    for at, kind, price in history:
+        if kind == "removed":
+            line = "removed"
+        elif price is None:
+            line = f"{'?':>12} kr  (price not given)"
+        else:
+            line = f"{_sek(price):>12} kr"
+            if previous is not None:
+                line += f"  ({'+' if price > previous else '-'}{_sek(abs(price - previous))})"
+            previous = price
+        print(f"{datetime.fromtimestamp(at):%Y-%m-%d %H:%M}  {line}")
+
+
+def _stat(value, digits=0) -> str:
+    if value is None:
+        return "-"
+    return _sek(round(value)) if not digits else f"{value:.{digits}f}"
+
+
+def market_stats(kind: str, min_count: int) -> None:
+    """
+    One line per area (or city): listings counted, price per m² quartiles,
+    fee and days on market.
+    """
+    groups = [
+        g for g in get_market_stats().groups(kind)
+        if g.metrics["price_per_m2"].n >= min_count
+    ]
+    groups.sort(key=lambda g: -(g.metrics["price_per_m2"].quantile(0.5) or 0))
+    print(
+        f"{kind:<24} {'n':>5} {'kr/m² p25':>10} {'p50':>10} {'p75':>10} "
+        f"{'avgift medel':>13} {'dagar p50':>10}"
+    )
+    for g in groups:
+        ppm2, fee, days = (g.metrics[m] for m in ("price_per_m2", "monthly_fee_sek", "days_on_market"))
         print(
-            f"[{marker}] {a.address} ({a.area}, {a.city}) "
-            f"{a.living_area_m2} m², {a.rooms} rum, "
-            f"pris {a.price_sek} kr, avgift {a.monthly_fee_sek} kr/mån, "
-            f"vån {a.floor_text} | url: {a.url}"
+            f"{g.name:<24} {ppm2.n:>5} {_stat(ppm2.quantile(0.25)):>10} {_stat(ppm2.quantile(0.5)):>10} "
+            f"{_stat(ppm2.quantile(0.75)):>10} {_stat(fee.mean if fee.n else None):>13} "
+            f"{_stat(days.quantile(0.5), 1):>10}"
         )
+    print(f"\n{len(groups)} {kind}(s)")
+
+
+EXPORT_FORMATS = ("json", "jsonl", "csv", "ics")
+
+
+def _csv_value(value) -> object:
+    if isinstance(value, list):
+        return "; ".join(
+            v.raw_text if hasattr(v, "raw_text") else str(v) for v in value
+        )
+    return "" if value is None else value
+
+
+def export(fmt: Optional[str], out: Optional[Path]) -> None:
+    """
+    Write the stored listings to `out` (stdout if None) as json, jsonl,
+    csv or ics (the viewings feed). The format defaults to out's suffix.
+    """
+    if fmt is None:
+        fmt = out.suffix.lstrip(".") if out is not None else "json"
+        if fmt not in EXPORT_FORMATS:
+            raise SystemExit(f"can't tell the export format from {out}; pass --format")
+    stream = out.open("w", encoding="utf-8", newline="") if out is not None else sys.stdout
+    try:
+        _export(fmt, stream)
+    finally:
+        if out is not None:
+            stream.close()
+    if out is not None:
+        print(f"Exported to {out}", file=sys.stderr)
+
+
+def _export(fmt: str, stream) -> None:
+    if fmt == "jsonl":
+        from .storage import listing_to_json
+
+        for a in iter_listings():
+            stream.write(listing_to_json(a) + "\n")
+    elif fmt == "json":
+        import json
+        from dataclasses import asdict
+
+        json.dump([asdict(a) for a in iter_listings()], stream, ensure_ascii=False, indent=2)
+        stream.write("\n")
+    elif fmt == "csv":
+        import csv
+        from dataclasses import fields
+
+        names = [f.name for f in fields(ListingDetail)]
+        writer = csv.writer(stream)
+        writer.writerow(names)
+        for a in iter_listings():
+            writer.writerow([_csv_value(getattr(a, n)) for n in names])
+    else:
+        from .calendar_feed import get_viewings_feed
+
+        stream.write(get_viewings_feed().render(iter_listings()))
+
+
+def _add_scrape_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="keep running and print new listings as they appear",
+    )
+    parser.add_argument(
+        "--cycles", type=int, default=None,
+        help="with --watch: stop after this many poll cycles",
+    )
+    parser.add_argument(
+        "--serve", action="store_true",
+        help="serve the listings over HTTP (refreshed every cycle with --watch)",
+    )
+    parser.add_argument(
+        "--port", type=int, default=API_PORT,
+        help="with --serve: port to listen on",
+    )
+    parser.add_argument(
+        "--metrics-out", type=Path, default=None,
+        help="write per-stage metrics to this file (.json, else Prometheus text)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="run under cProfile and print the hottest functions",
+    )
+    parser.add_argument(
+        "--profile-top", type=int, default=30,
+        help="with --profile: how many functions to print",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="real_estate")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    scrape = commands.add_parser("scrape", help="crawl the searches and store the results (default)")
+    _add_scrape_arguments(scrape)
+
+    listing = commands.add_parser("list", help="print the listings stored by the last scrape")
+    listing.add_argument("--area", default=None, help="only this area (case-insensitive)")
+    listing.add_argument("--city", default=None, help="only this city (case-insensitive)")
+    listing.add_argument("--sort", choices=("stored", "price", "first-seen"), default="stored")
+    listing.add_argument("--limit", type=int, default=None)
+
+    new = commands.add_parser("new-since", help="stored listings first seen at or after WHEN")
+    new.add_argument("since", metavar="WHEN", type=_since, help="epoch seconds, ISO date/datetime, or an age like 36h / 7d")
+
+    changes = commands.add_parser("changes", help="logged changes (new, removed, price/fee/status) since WHEN")
+    changes.add_argument("since", metavar="WHEN", type=_since, help="epoch seconds, ISO date/datetime, or an age like 36h / 7d")
+    changes.add_argument("--kind", action="append", choices=CHANGE_KINDS, default=None, help="only these kinds (repeatable)")
+
+    history = commands.add_parser("price-history", help="every price a listing has had")
+    history.add_argument("booli_id", type=int)
+
+    stats = commands.add_parser("stats", help="market statistics per area or city")
+    stats.add_argument("--city", action="store_const", const="city", dest="kind", default="area", help="per city instead of per area")
+    stats.add_argument("--min-count", type=int, default=1, help="skip groups with fewer listings")
+
+    exporter = commands.add_parser("export", help="write the stored listings to a file or stdout")
+    exporter.add_argument("--format", choices=EXPORT_FORMATS, default=None, help="default: from -o's suffix, else json")
+    exporter.add_argument("-o", "--output", type=Path, default=None, help="default: stdout")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # no command (or just scrape flags, as before subcommands): scrape
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv.insert(0, "scrape")
+    args = build_parser().parse_args(argv)
+
+    if args.command == "list":
+        return list_stored(args.area, args.city, args.sort, args.limit)
+    if args.command == "new-since":
+        return new_since(args.since)
+    if args.command == "changes":
+        return changes_since(args.since, args.kind)
+    if args.command == "price-history":
+        return price_history(args.booli_id)
+    if args.command == "stats":
+        return market_stats(args.kind, args.min_count)
+    if args.command == "export":
+        return export(args.format, args.output)
+
+    if args.serve:
+        serve(args.port, args.watch, args.cycles)
+        return
+    if args.watch:
+        watch(args.cycles)
+        return
+
+    if args.profile:
+        profiled(run_once, args.profile_top)
+    else:
+        run_once()
+    if args.metrics_out:
+        metrics.export(args.metrics_out)
+        print(f"\nMetrics written to {args.metrics_out}")
 
 
 if __name__ == "__main__":
     main()
-
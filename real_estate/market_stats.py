@@ -0,0 +1,413 @@
+# real_estate/market_stats.py
+
+import json
+import math
+import threading
+import time
+from bisect import bisect_right, insort
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import (
+    MARKET_STATS_QUANTILES,
+    MARKET_STATS_EXACT_UNTIL,
+    CHEAP_QUANTILE,
+    CHEAP_MIN_LISTINGS,
+    MARKET_STATS_GONE_AFTER_RUNS,
+    MARKET_STATS_REOPEN_DAYS,
+)
+from .metrics import timed
+from .models import ListingDetail
+from .storage import DATA_DIR, _atomic_write
+
+MARKET_STATS_PATH = DATA_DIR / "market_stats.json"
+
+METRICS = ("price_per_m2", "monthly_fee_sek", "days_on_market")
+GROUP_KINDS = ("area", "city")
+
+DAY = 24 * 60 * 60
+
+
+def _exact_quantile(values: List[float], q: float) -> float:
+    # linear interpolation between the closest ranks, values sorted
+    pos = q * (len(values) - 1)
+    lo = int(pos)
+    if lo + 1 >= len(values):
+        return values[-1]
+    return values[lo] + (pos - lo) * (values[lo + 1] - values[lo])
+
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile with Jain & Chlamtac's P²
+    algorithm: five markers, O(1) memory and time per value, no values
+    kept. Started from a sorted sample (at least 5 values) rather than
+    the first 5 values, which makes it much steadier early on.
+    """
+
+    __slots__ = ("q", "heights", "positions", "desired")
+
+    def __init__(self, q: float, heights: List[float], positions: List[int], desired: List[float]):
+        self.q = q
+        self.heights = heights
+        self.positions = positions
+        self.desired = desired
+
+    @classmethod
+    def from_sorted(cls, q: float, values: List[float]) -> "P2Quantile":
+        n = len(values)
+        desired = [1 + f * (n - 1) for f in (0.0, q / 2, q, (1 + q) / 2, 1.0)]
+        positions = [int(round(d)) for d in desired]
+        for i in (1, 2, 3):  # markers must sit on distinct ranks
+            positions[i] = min(max(positions[i], positions[i - 1] + 1), n - 4 + i)
+        heights = [values[p - 1] for p in positions]
+        return cls(q, heights, positions, desired)
+
+    def add(self, x: float) -> None:
+        h, n, q = self.heights, self.positions, self.q
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = bisect_right(h, x) - 1  # h[k] <= x < h[k + 1]
+        for i in range(k + 1, 5):
+            n[i] += 1
+        d = self.desired
+        d[1] += q / 2
+        d[2] += q
+        d[3] += (1 + q) / 2
+        d[4] += 1
+
+        for i in (1, 2, 3):
+            off = d[i] - n[i]
+            if (off >= 1 and n[i + 1] - n[i] > 1) or (off <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if off > 0 else -1
+                # piecewise-parabolic prediction, linear if that leaves the neighbours' range
+                guess = h[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not h[i - 1] < guess < h[i + 1]:
+                    guess = h[i] + step * (h[i + step] - h[i]) / (n[i + step] - n[i])
+                h[i] = guess
+                n[i] += step
+
+    def value(self) -> float:
+        return self.heights[2]
+
+    def to_json(self) -> list:
+        return [self.heights, self.positions, self.desired]
+
+    @classmethod
+    def from_json(cls, q: float, raw: list) -> "P2Quantile":
+        return cls(q, *raw)
+
+
+class RunningStats:
+    """
+    count / mean / std (Welford) / min / max and quantiles of one metric
+    in one group. Quantiles are exact over the kept values until there
+    are MARKET_STATS_EXACT_UNTIL of them, then P² estimates.
+    """
+
+    __slots__ = ("n", "mean", "m2", "min", "max", "values", "sketches")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.values: Optional[List[float]] = []  # sorted; None once sketched
+        self.sketches: Dict[float, P2Quantile] = {}
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+        if self.values is None:
+            for sketch in self.sketches.values():
+                sketch.add(x)
+            return
+        insort(self.values, x)
+        if len(self.values) >= max(5, MARKET_STATS_EXACT_UNTIL):
+            self.sketches = {q: P2Quantile.from_sorted(q, self.values) for q in MARKET_STATS_QUANTILES}
+            self.values = None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        One of the MARKET_STATS_QUANTILES (None for others, or no values).
+        """
+        if self.values is not None:
+            if not self.values or q not in MARKET_STATS_QUANTILES:
+                return None
+            return _exact_quantile(self.values, q)
+        sketch = self.sketches.get(q)
+        return sketch.value() if sketch is not None else None
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        out: Dict[str, Optional[float]] = {
+            "count": self.n,
+            "mean": round(self.mean, 1) if self.n else None,
+            "std": round(math.sqrt(self.m2 / (self.n - 1)), 1) if self.n > 1 else None,
+            "min": round(self.min, 1) if self.n else None,
+            "max": round(self.max, 1) if self.n else None,
+        }
+        for q in MARKET_STATS_QUANTILES:
+            value = self.quantile(q)
+            out[f"p{round(100 * q)}"] = round(value, 1) if value is not None else None
+        return out
+
+    def to_json(self) -> dict:
+        raw = {
+            "n": self.n, "mean": self.mean, "m2": self.m2,
+            "min": self.min if self.n else None, "max": self.max if self.n else None,
+        }
+        if self.values is not None:
+            raw["values"] = self.values
+        else:
+            raw["q"] = {str(q): s.to_json() for q, s in self.sketches.items()}
+        return raw
+
+    @classmethod
+    def from_json(cls, raw: dict) -> "RunningStats":
+        stats = cls()
+        stats.n, stats.mean, stats.m2 = raw["n"], raw["mean"], raw["m2"]
+        if stats.n:
+            stats.min, stats.max = raw["min"], raw["max"]
+        if "values" in raw:
+            stats.values = raw["values"]
+        else:
+            stats.values = None
+            stats.sketches = {float(q): P2Quantile.from_json(float(q), s) for q, s in raw["q"].items()}
+        return stats
+
+
+class Group:
+    __slots__ = ("name", "metrics")
+
+    def __init__(self, name: str):
+        self.name = name  # as first seen; groups are keyed case-insensitively
+        self.metrics = {m: RunningStats() for m in METRICS}
+
+    def summary(self) -> dict:
+        return {"name": self.name, **{m: s.summary() for m, s in self.metrics.items()}}
+
+
+def price_per_m2(listing: ListingDetail) -> Optional[float]:
+    if not listing.price_sek or not listing.living_area_m2:
+        return None
+    return listing.price_sek / listing.living_area_m2
+
+
+class MarketStats:
+    """
+    Running per-area and per-city statistics of the listings we track:
+      - price_per_m2, monthly_fee_sek: taken when a listing first shows up
+        (its asking price and fee)
+      - days_on_market: taken when it leaves the listing set, counted
+        from when it went up on Booli
+    record() only looks at arrivals and departures. Past
+    MARKET_STATS_EXACT_UNTIL values a statistic is a handful of numbers
+    (P² markers, not the values), lookups are O(1) and nothing is ever
+    recomputed. The listings
+    currently on the market are remembered (area, city, listing date)
+    until they leave; the IDs of those that left, so that each listing
+    is counted once. A listing back within MARKET_STATS_REOPEN_DAYS of
+    leaving is reopened (its days on market stay counted); one back later
+    never counts again, so delete market_stats.json to start over.
+    """
+
+    def __init__(self, path: Path = MARKET_STATS_PATH):
+        self.path = path
+        self._groups: Optional[Dict[Tuple[str, str], Group]] = None
+        # booli_id -> [area, city, on Booli since (epoch) or None,
+        #              runs missed in a row, first missed at (epoch) or None]
+        self._open: Dict[int, list] = {}
+        # booli_id -> [area, city, on Booli since or None, closed at (epoch)],
+        # until MARKET_STATS_REOPEN_DAYS have passed; then just the ID
+        self._recently_closed: Dict[int, list] = {}
+        self._closed: Set[int] = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _index(self) -> Dict[Tuple[str, str], Group]:
+        if self._groups is None:
+            groups: Dict[Tuple[str, str], Group] = {}
+            if self.path.exists():
+                try:
+                    with self.path.open("r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                    for kind, key, name, metrics in raw["groups"]:
+                        group = groups[kind, key] = Group(name)
+                        for m, stats in metrics.items():
+                            if m in group.metrics:
+                                group.metrics[m] = RunningStats.from_json(stats)
+                    self._open = {int(k): (v + [0, None])[:5] for k, v in raw["open"].items()}
+                    self._recently_closed = {int(k): v for k, v in raw.get("recently_closed", {}).items()}
+                    self._closed = set(raw.get("closed", ()))
+                except (ValueError, KeyError, TypeError):
+                    # unreadable: the next record() counts the current listings again
+                    groups = {}
+                    self._open = {}
+                    self._recently_closed = {}
+                    self._closed = set()
+            self._groups = groups
+        return self._groups
+
+    def _groups_of(self, area: Optional[str], city: Optional[str]) -> List[Group]:
+        groups = self._index()
+        found = []
+        for kind, name in (("area", area), ("city", city)):
+            if not name:
+                continue
+            group = groups.get((kind, name.casefold()))
+            if group is None:
+                group = groups[kind, name.casefold()] = Group(name)
+            found.append(group)
+        return found
+
+    def record(
+        self,
+        listings: Iterable[ListingDetail],
+        now: Optional[float] = None,
+        gone: Optional[Callable[[int], bool]] = None,
+    ) -> int:
+        """
+        Update the statistics from the current listing set: listings not
+        seen before are added. A listing missing from it is closed once it
+        has been gone for MARKET_STATS_GONE_AFTER_RUNS calls in a row, with
+        its days on market counted up to when it first went missing. One
+        closed less than MARKET_STATS_REOPEN_DAYS ago is reopened.
+        `gone(booli_id)` says whether a missing listing has really left
+        (default: always); calls where it hasn't don't count.
+        Returns how many listings arrived or left.
+        """
+        now = time.time() if now is None else now
+        changed = 0
+        with timed("market_stats"), self._lock:
+            self._index()
+            current = set()
+            for listing in listings:
+                current.add(listing.booli_id)
+                entry = self._open.get(listing.booli_id)
+                if entry is not None:
+                    if entry[3]:
+                        entry[3:] = [0, None]  # back after going missing
+                        self._dirty = True
+                    continue
+                closed = self._recently_closed.pop(listing.booli_id, None)
+                if closed is not None:
+                    # its days on market are in the stats already: a second
+                    # close mustn't add them again (since = None)
+                    self._open[listing.booli_id] = [closed[0], closed[1], None, 0, None]
+                    changed += 1
+                    continue
+                if listing.booli_id in self._closed:
+                    continue  # counted already; relisted
+                changed += 1
+                for group in self._groups_of(listing.area, listing.city):
+                    ppm2 = price_per_m2(listing)
+                    if ppm2 is not None:
+                        group.metrics["price_per_m2"].add(ppm2)
+                    if listing.monthly_fee_sek is not None:
+                        group.metrics["monthly_fee_sek"].add(listing.monthly_fee_sek)
+                since = None
+                if listing.days_on_booli is not None:
+                    since = (listing.first_seen_at or now) - listing.days_on_booli * DAY
+                self._open[listing.booli_id] = [listing.area, listing.city, since, 0, None]
+
+            for booli_id in [i for i in self._open if i not in current]:
+                if gone is not None and not gone(booli_id):
+                    continue
+                entry = self._open[booli_id]
+                entry[3] += 1
+                entry[4] = entry[4] or now
+                self._dirty = True
+                if entry[3] < MARKET_STATS_GONE_AFTER_RUNS:
+                    continue
+                area, city, since, _, left = self._open.pop(booli_id)
+                self._recently_closed[booli_id] = [area, city, since, now]
+                changed += 1
+                if since is not None:
+                    for group in self._groups_of(area, city):
+                        group.metrics["days_on_market"].add((left - since) / DAY)
+
+            cutoff = now - MARKET_STATS_REOPEN_DAYS * DAY
+            for booli_id in [i for i, c in self._recently_closed.items() if c[3] < cutoff]:
+                del self._recently_closed[booli_id]
+                self._closed.add(booli_id)
+                self._dirty = True
+            if changed:
+                self._dirty = True
+        return changed
+
+    def flush(self) -> None:
+        """
+        Write the statistics to disk if anything changed.
+        """
+        with self._lock:
+            if not self._dirty or self._groups is None:
+                return
+            raw = {
+                "groups": [
+                    [kind, key, g.name, {m: s.to_json() for m, s in g.metrics.items()}]
+                    for (kind, key), g in self._groups.items()
+                ],
+                "open": {str(k): v for k, v in self._open.items()},
+                "recently_closed": {str(k): v for k, v in self._recently_closed.items()},
+                "closed": sorted(self._closed),
+            }
+            with _atomic_write(self.path) as f:
+                json.dump(raw, f, ensure_ascii=False, separators=(",", ":"))
+            self._dirty = False
+
+    # --- lookups ---
+
+    def get(self, kind: str, name: str) -> Optional[Group]:
+        """
+        The group for an area or city name (case-insensitive), if any.
+        """
+        with self._lock:
+            return self._index().get((kind, name.casefold()))
+
+    def groups(self, kind: str) -> List[Group]:
+        with self._lock:
+            return [g for (k, _), g in self._index().items() if k == kind]
+
+    def cheap_for_area(self, listing: ListingDetail) -> Optional[float]:
+        """
+        If the listing's price per m² is at or below its area's
+        CHEAP_QUANTILE (and the area has CHEAP_MIN_LISTINGS listings to go
+        on), the area's median price per m², else None.
+        """
+        ppm2 = price_per_m2(listing)
+        if ppm2 is None or not listing.area:
+            return None
+        group = self.get("area", listing.area)
+        if group is None:
+            return None
+        stats = group.metrics["price_per_m2"]
+        threshold = stats.quantile(CHEAP_QUANTILE)
+        if stats.n < CHEAP_MIN_LISTINGS or threshold is None or ppm2 > threshold:
+            return None
+        return stats.quantile(0.5) or stats.mean
+
+
+_stats: Optional[MarketStats] = None
+_stats_lock = threading.Lock()
+
+
+def get_market_stats() -> MarketStats:
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = MarketStats()
+    return _stats
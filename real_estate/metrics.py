@@ -0,0 +1,244 @@
+# real_estate/metrics.py
+
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from .config import METRICS_ENABLED
+
+# Latency histogram bucket upper bounds, in ms (plus an implicit +Inf).
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate from the buckets (linear within the bucket), like
+        Prometheus' histogram_quantile. Capped at the observed max.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = BUCKETS_MS[i - 1] if i else 0.0
+                hi = BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+                return min(self.max, lo + (hi - lo) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+_lock = threading.Lock()
+_timers: Dict[Tuple[str, Labels], Histogram] = {}
+_counters: Dict[Tuple[str, Labels], float] = {}
+
+
+def _key(name: str, labels: Dict[str, object]) -> Tuple[str, Labels]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, ms: float, **labels) -> None:
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        hist = _timers.get(key)
+        if hist is None:
+            hist = _timers[key] = Histogram()
+        hist.observe(ms)
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def timed(name: str, **labels) -> Iterator[None]:
+    """
+    Record how long the block takes in the `name` histogram. Also counts
+    `errors` for `name` when the block raises.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        count("errors", stage=name, **labels)
+        raise
+    finally:
+        observe(name, 1000 * (time.perf_counter() - started), **labels)
+
+
+def reset() -> None:
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def take() -> Tuple[list, list]:
+    """
+    Remove and return everything recorded so far in this process, as
+    plain tuples for merge(). Parser processes (pipeline.py) send theirs
+    back with each result.
+    """
+    with _lock:
+        timers = [(name, labels, h.counts, h.count, h.sum, h.max) for (name, labels), h in _timers.items()]
+        counters = [(name, labels, value) for (name, labels), value in _counters.items()]
+        _timers.clear()
+        _counters.clear()
+    return timers, counters
+
+
+def merge(taken: Tuple[list, list]) -> None:
+    """
+    Add metrics from take() (usually another process's) to this process's.
+    """
+    timers, counters = taken
+    with _lock:
+        for name, labels, counts, n, total, peak in timers:
+            hist = _timers.get((name, labels))
+            if hist is None:
+                hist = _timers[name, labels] = Histogram()
+            hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+            hist.count += n
+            hist.sum += total
+            hist.max = max(hist.max, peak)
+        for name, labels, value in counters:
+            _counters[name, labels] = _counters.get((name, labels), 0) + value
+
+
+def _label_text(labels: Labels) -> str:
+    return ",".join(f"{k}={v}" for k, v in labels)
+
+
+def summary_table() -> str:
+    """
+    One line per timer (count, total, p50/p95/max ms) and per counter.
+    """
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+
+    lines: List[str] = []
+    if timers:
+        lines.append(
+            f"{'stage':<44} {'count':>6} {'total ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}"
+        )
+        for (name, labels), h in timers:
+            label = f"{name}[{_label_text(labels)}]" if labels else name
+            lines.append(
+                f"{label:<44} {h.count:>6} {h.sum:>10.1f} {h.quantile(0.5):>8.1f} "
+                f"{h.quantile(0.95):>8.1f} {h.max:>8.1f}"
+            )
+    if counters:
+        if lines:
+            lines.append("")
+        for (name, labels), value in counters:
+            label = f"{name}[{_label_text(labels)}]" if labels else name
+            lines.append(f"{label:<44} {value:>10g}")
+    return "\n".join(lines)
+
+
+def as_dict() -> Dict[str, list]:
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+    return {
+        "timers": [
+            {
+                "name": name,
+                "labels": dict(labels),
+                "count": h.count,
+                "sum_ms": round(h.sum, 3),
+                "max_ms": round(h.max, 3),
+                "p50_ms": round(h.quantile(0.5), 3),
+                "p95_ms": round(h.quantile(0.95), 3),
+                "buckets_ms": dict(zip([*map(str, BUCKETS_MS), "+Inf"], h.counts)),
+            }
+            for (name, labels), h in timers
+        ],
+        "counters": [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in counters
+        ],
+    }
+
+
+def _prom_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def as_prometheus() -> str:
+    """
+    Prometheus text exposition format: timers as `real_estate_<name>_ms`
+    histograms, counters as `real_estate_<name>_total`.
+    """
+    with _lock:
+        timers = sorted(_timers.items())
+        counters = sorted(_counters.items())
+
+    lines: List[str] = []
+    declared = set()
+    for (name, labels), h in timers:
+        metric = f"real_estate_{name}_ms"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} histogram")
+            declared.add(metric)
+        cumulative = 0
+        for bound, n in zip([*BUCKETS_MS, math.inf], h.counts):
+            cumulative += n
+            le = '"+Inf"' if bound is math.inf else f'"{bound}"'
+            lines.append(f"{metric}_bucket{_prom_labels(labels, 'le=' + le)} {cumulative}")
+        lines.append(f"{metric}_sum{_prom_labels(labels)} {h.sum:.3f}")
+        lines.append(f"{metric}_count{_prom_labels(labels)} {h.count}")
+    for (name, labels), value in counters:
+        metric = f"real_estate_{name}_total"
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} counter")
+            declared.add(metric)
+        lines.append(f"{metric}{_prom_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path: Path) -> None:
+    """
+    Write all metrics to `path`: JSON for *.json, Prometheus text otherwise.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        text = json.dumps(as_dict(), ensure_ascii=False, indent=2) + "\n"
+    else:
+        text = as_prometheus()
+    path.write_text(text, encoding="utf-8")
@@ -1,11 +1,29 @@
 # real_estate/models.py
 
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, fields
+from operator import attrgetter
 from typing import Optional, List
 
+# Text fields with a handful of distinct values shared by thousands of
+# listings ("Stockholm", "bostadsrätt", "Inkommet idag", ...). Parsers and
+# loaders sys.intern() them so there's one copy of each.
+INTERNED_FIELDS = ("area", "city", "broker_company", "status_text", "ownership_type")
 
 
-@dataclass
+def intern_fields(item: dict) -> dict:
+    """
+    Intern the INTERNED_FIELDS of a field dict in place (before building a
+    ListingDetail from it); returns `item`.
+    """
+    for name in INTERNED_FIELDS:
+        value = item.get(name)
+        if isinstance(value, str):
+            item[name] = sys.intern(value)
+    return item
+
+
+@dataclass(slots=True)
 class ListingSummary:
     booli_id: int
     url: str
@@ -25,13 +43,23 @@ class ListingSummary:
     has_balcony: Optional[bool] = None
     has_outdoor_space: Optional[bool] = None
 
-@dataclass
+    # names of the config.SEARCHES that returned this listing
+    searches: Optional[List[str]] = None
+
+
+@dataclass(slots=True)
 class Viewing:
     raw_text: str
+    # parsed from raw_text (see scraper_detail.parse_viewing)
+    date: Optional[str] = None  # ISO date
+    start: Optional[str] = None  # "HH:MM", Swedish local time
+    end: Optional[str] = None
+    kind: Optional[str] = None  # open / private / digital / other
 
 
-@dataclass
+@dataclass(slots=True)
 class ListingDetail:
+    # NB: the ListingSummary fields come first (see from_summary)
     booli_id: int
     url: str
     address: str
@@ -48,6 +76,7 @@ class ListingDetail:
     has_balcony: Optional[bool] = None
     has_outdoor_space: Optional[bool] = None
     status_text: Optional[str] = None
+    searches: Optional[List[str]] = None
 
     drift_cost_sek: Optional[int] = None
     floor_of: Optional[str] = None
@@ -64,3 +93,28 @@ class ListingDetail:
 
     viewings: Optional[List[Viewing]] = None
 
+    # names of the FILTER_PROFILES this listing matched (see filters.py)
+    profiles: Optional[List[str]] = None
+
+    # bookkeeping for incremental runs (see incremental.py)
+    summary_fingerprint: Optional[str] = None
+    enriched_at: Optional[float] = None
+    # when this booli_id first showed up in our results (epoch seconds)
+    first_seen_at: Optional[float] = None
+
+    @classmethod
+    def from_summary(cls, summary: ListingSummary, **detail) -> "ListingDetail":
+        """
+        Promote a ListingSummary: its fields are passed positionally in one
+        C-level attrgetter call, no per-instance dict involved.
+        `detail` holds the detail-only fields.
+        """
+        return cls(*_summary_values(summary), **detail)
+
+
+# ListingDetail's leading fields, in its own order, all taken from the summary
+_PROMOTED = tuple(f.name for f in fields(ListingDetail))[: len(fields(ListingSummary))]
+assert set(_PROMOTED) == {f.name for f in fields(ListingSummary)}, (
+    "ListingDetail must start with exactly the ListingSummary fields"
+)
+_summary_values = attrgetter(*_PROMOTED)
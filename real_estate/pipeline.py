@@ -0,0 +1,203 @@
+# real_estate/pipeline.py
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import astuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .broker_cache import get_broker_cache
+from .config import DETAIL_WORKERS, PARSE_WORKERS, PIPELINE_QUEUE_SIZE
+from .http_client import fetch_text
+from . import metrics
+from .metrics import observe, timed
+from .models import ListingDetail, ListingSummary, Viewing, intern_fields
+from .scraper_detail import (
+    BOOLI_DETAIL,
+    BrokerInfo,
+    build_detail,
+    parse_booli_detail,
+    parse_svenskfast_broker,
+)
+
+# parse_booli_detail() keys, in the order a parse result tuple holds them
+DETAIL_NAMES = tuple(f.name for f in BOOLI_DETAIL.fields) + tuple(l.name for l in BOOLI_DETAIL.links)
+
+_DONE = object()
+
+
+# --- Worker process side: bytes in, plain tuples out ---
+# Each result also carries the metrics the parse recorded in the worker
+# (parse, extract, ...), for the parent to merge into its own.
+
+def _parse_detail_page(data: bytes) -> Tuple[tuple, float, tuple]:
+    started = time.perf_counter()
+    found = parse_booli_detail(data.decode("utf-8"))
+    values = []
+    for name in DETAIL_NAMES:
+        value = found.get(name)
+        if name == "viewings" and value is not None:
+            value = tuple(astuple(v) for v in value)
+        values.append(value)
+    return tuple(values), 1000 * (time.perf_counter() - started), metrics.take()
+
+
+def _parse_broker_page(data: bytes) -> Tuple[BrokerInfo, float, tuple]:
+    started = time.perf_counter()
+    info = parse_svenskfast_broker(data.decode("utf-8"))
+    return info, 1000 * (time.perf_counter() - started), metrics.take()
+
+
+def _unpack_detail(values: tuple) -> Dict[str, Any]:
+    found: Dict[str, Any] = {}
+    for name, value in zip(DETAIL_NAMES, values):
+        if value is None:
+            continue
+        if name == "viewings":
+            value = [Viewing(*v) for v in value]
+        found[name] = value
+    return intern_fields(found)  # unpickled strings are fresh copies
+
+
+def _mp_context():
+    # Never fork: by now the parent runs fetch threads, the HTTP session's
+    # pool and maybe the API server.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+# --- Parent side ---
+
+def enrich_pipeline(
+    summaries: Iterable[ListingSummary],
+    io_workers: Optional[int] = None,
+    parse_workers: Optional[int] = None,
+    queue_size: Optional[int] = None,
+) -> Tuple[List[ListingDetail], List[Tuple[ListingSummary, Exception]]]:
+    """
+    enrich_all() with parsing moved out of the GIL's way:
+
+      fetch threads --raw HTML--> bounded queue --> parser processes
+          --field tuples--> finish threads (broker lookup, ListingDetail)
+
+    `io_workers` threads only fetch. Pages travel to the `parse_workers`
+    processes as UTF-8 bytes and come back as tuples of plain values,
+    never as soup trees. At most 2 * parse_workers pages are being parsed
+    and `queue_size` more wait in the queue. Past that, fetchers block
+    until a parser is free, so a slow pool pauses fetching.
+    Same return value as enrich_all(): details in `summaries` order minus
+    failures, and (summary, error) pairs.
+    """
+    io_workers = io_workers or DETAIL_WORKERS
+    parse_workers = parse_workers or PARSE_WORKERS or os.cpu_count() or 1
+    queue_size = queue_size or PIPELINE_QUEUE_SIZE
+
+    pages: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+    slots = threading.BoundedSemaphore(2 * parse_workers)
+    order: List[ListingSummary] = []
+    results: Dict[int, Any] = {}
+    feed_error: List[BaseException] = []
+    parser_error: List[Exception] = []  # the pool broke: fail the rest
+
+    with ThreadPoolExecutor(io_workers, thread_name_prefix="fetch") as fetchers, \
+            ThreadPoolExecutor(io_workers, thread_name_prefix="finish") as finishers, \
+            ProcessPoolExecutor(parse_workers, mp_context=_mp_context()) as parsers:
+
+        def fetch(i: int, summary: ListingSummary) -> None:
+            try:
+                if parser_error:
+                    raise parser_error[0]
+                data: Any = fetch_text(summary.url).encode("utf-8")
+            except Exception as exc:
+                data = exc
+            with timed("pipeline_queue_put"):
+                pages.put((i, summary, data))  # blocks while the queue is full
+
+        def feed() -> None:
+            # iterating `summaries` may drive the search crawl: keep it off
+            # the dispatcher thread
+            try:
+                jobs = []
+                for i, summary in enumerate(summaries):
+                    order.append(summary)
+                    jobs.append(fetchers.submit(fetch, i, summary))
+                for job in jobs:
+                    job.result()
+            except BaseException as exc:
+                feed_error.append(exc)
+            finally:
+                pages.put(_DONE)
+
+        def scrape_broker(url: str) -> BrokerInfo:
+            data = fetch_text(url).encode("utf-8")
+            info, ms, taken = parsers.submit(_parse_broker_page, data).result()
+            metrics.merge(taken)
+            observe("pipeline_parse", ms, page="svenskfast_broker")
+            return info
+
+        def broker(url: str) -> BrokerInfo:
+            try:
+                return get_broker_cache().get(url, scrape_broker)
+            except Exception:
+                return None, None, None
+
+        def finish(i: int, summary: ListingSummary, parsed: "Future[Tuple[tuple, float, tuple]]") -> None:
+            try:
+                values, ms, taken = parsed.result()
+            except Exception as exc:
+                results[i] = exc
+                return
+            finally:
+                slots.release()
+            metrics.merge(taken)
+            observe("pipeline_parse", ms, page="booli_detail")
+            try:
+                results[i] = build_detail(summary, _unpack_detail(values), broker)
+            except Exception as exc:
+                results[i] = exc
+
+        feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+        feeder.start()
+        finishing = []
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                break
+            i, summary, data = item
+            if isinstance(data, Exception):
+                results[i] = data
+                continue
+            if not parser_error:
+                slots.acquire()
+                try:
+                    parsed = parsers.submit(_parse_detail_page, data)
+                except Exception as exc:
+                    # e.g. BrokenProcessPool. Keep taking pages until _DONE
+                    # (fetchers block on a full queue otherwise); fetchers
+                    # fail the rest without fetching.
+                    slots.release()
+                    parser_error.append(exc)
+                else:
+                    finishing.append(finishers.submit(finish, i, summary, parsed))
+                    continue
+            results[i] = parser_error[0]
+        feeder.join()
+        for job in finishing:
+            job.result()
+
+    if feed_error:
+        raise feed_error[0]
+
+    details: List[ListingDetail] = []
+    failures: List[Tuple[ListingSummary, Exception]] = []
+    for i, summary in enumerate(order):
+        result = results[i]
+        if isinstance(result, Exception):
+            failures.append((summary, result))
+        else:
+            details.append(result)
+    return details, failures
@@ -0,0 +1,250 @@
+# real_estate/resilience.py
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+from .config import (
+    REQUEST_TIMEOUT,
+    ADAPTIVE_TIMEOUT_MULTIPLIER,
+    ADAPTIVE_TIMEOUT_MIN_SECONDS,
+    LATENCY_WINDOW,
+    LATENCY_MIN_SAMPLES,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BACKOFF_SECONDS,
+    RETRY_MAX_BACKOFF_SECONDS,
+    RETRY_AFTER_MAX_SECONDS,
+    RETRY_BUDGET_RATIO,
+    RETRY_BUDGET_MIN,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_SLOW_CALL_SECONDS,
+    CIRCUIT_COOLDOWN_SECONDS,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_MAX_RATIO,
+)
+from .metrics import count
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class HostUnavailable(Exception):
+    """
+    The host's circuit is open: the request was not sent.
+    """
+
+
+def retry_after_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    A Retry-After header (delta-seconds or an HTTP-date) as seconds from
+    now; None if missing or unreadable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when - now)
+
+
+class HostGuard:
+    """
+    What we know about one host: its recent latencies (for the adaptive
+    timeout and the hedge delay), its retry budget and its circuit
+    breaker. http_client asks before every request and reports after.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = CLOSED
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.short_circuited = 0
+        self.opened = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._sorted: Optional[list] = None  # _latencies sorted, until the next sample
+        self._budget = float(RETRY_BUDGET_MIN)
+        self._failures = 0  # in a row
+        self._open_until = 0.0
+        self._probing = False
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    # --- latency ---
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Recent latency quantile in seconds; None until LATENCY_MIN_SAMPLES.
+        """
+        with self._lock:
+            if len(self._latencies) < LATENCY_MIN_SAMPLES:
+                return None
+            if self._sorted is None:
+                self._sorted = sorted(self._latencies)
+            values = self._sorted
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def timeout(self) -> float:
+        p99 = self.quantile(0.99)
+        if p99 is None:
+            return REQUEST_TIMEOUT
+        return min(REQUEST_TIMEOUT, max(ADAPTIVE_TIMEOUT_MIN_SECONDS, ADAPTIVE_TIMEOUT_MULTIPLIER * p99))
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        How long to wait for an answer before hedging; None = don't hedge
+        (not enough samples, or the hedge budget is spent).
+        """
+        p95 = self.quantile(0.95)
+        if p95 is None:
+            return None
+        with self._lock:
+            if self.hedges + 1 > HEDGE_MAX_RATIO * self.requests:
+                return None
+        return max(HEDGE_MIN_DELAY_SECONDS, p95)
+
+    def hedged(self) -> None:
+        with self._lock:
+            self.hedges += 1
+        count("http_hedges", host=self.host)
+
+    # --- circuit breaker ---
+
+    def before_request(self) -> bool:
+        """
+        Wait out a Retry-After pause, then let the request through or
+        raise HostUnavailable while the circuit is open. Once the cooldown
+        is over, exactly one caller gets through as the probe. Returns
+        True for the probe; pass it back to record().
+        """
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        with self._lock:
+            if self.state == CLOSED:
+                self.requests += 1
+                self._budget = min(self._budget + RETRY_BUDGET_RATIO, RETRY_BUDGET_MIN)
+                return False
+            if self.state == OPEN and time.monotonic() >= self._open_until:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self.requests += 1
+                return True
+            self.short_circuited += 1
+        count("http_short_circuited", host=self.host)
+        raise HostUnavailable(f"{self.host}: circuit open after repeated failures")
+
+    def record(self, ok: bool, seconds: Optional[float], probe: bool = False) -> None:
+        """
+        Report how a request went and how long it took (None: unknown,
+        e.g. connection refused); `probe` is what before_request() returned
+        for it. Every request let through must be recorded, or a probe
+        would hold the circuit half-open. Slow answers count as failures
+        for the breaker (but are still used).
+        """
+        failed = not ok or (seconds is not None and seconds > CIRCUIT_SLOW_CALL_SECONDS)
+        opened = False
+        with self._lock:
+            if seconds is not None:
+                self._latencies.append(seconds)
+                self._sorted = None
+            if probe:
+                self._probing = False
+            if not failed:
+                self._failures = 0
+                if probe:
+                    self.state = CLOSED
+                return
+            self._failures += 1
+            if probe or (self.state == CLOSED and self._failures >= CIRCUIT_FAILURE_THRESHOLD):
+                self.state = OPEN
+                self._open_until = time.monotonic() + CIRCUIT_COOLDOWN_SECONDS
+                self.opened += 1
+                opened = True
+        if opened:
+            count("circuit_opened", host=self.host)
+
+    # --- retries ---
+
+    def retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds to sleep before retry number `attempt` (1, 2, ...), or None
+        to give up: out of attempts or budget, circuit open, or the server
+        asks us to come back later than RETRY_AFTER_MAX_SECONDS.
+        """
+        if attempt >= RETRY_MAX_ATTEMPTS:
+            return None
+        if retry_after is not None and retry_after > RETRY_AFTER_MAX_SECONDS:
+            return None
+        with self._lock:
+            if self.state != CLOSED or self._budget < 1:
+                return None
+            self._budget -= 1
+            self.retries += 1
+        count("http_retries", host=self.host)
+        # full jitter, so the workers that failed together don't retry together
+        backoff = random.uniform(0, min(RETRY_MAX_BACKOFF_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** attempt))
+        return max(backoff, retry_after or 0.0)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold every request to this host for `seconds` (a 429's Retry-After).
+        """
+        seconds = min(seconds, RETRY_AFTER_MAX_SECONDS)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, object]:
+        p50, p99 = self.quantile(0.5), self.quantile(0.99)
+        return {
+            "state": self.state,
+            "timeout_s": round(self.timeout(), 2),
+            "p50_ms": round(1000 * p50, 1) if p50 is not None else None,
+            "p99_ms": round(1000 * p99, 1) if p99 is not None else None,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "short_circuited": self.short_circuited,
+            "opened": self.opened,
+        }
+
+
+_guards: Dict[str, HostGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_host_guard(host: str) -> HostGuard:
+    guard = _guards.get(host)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(host)
+            if guard is None:
+                guard = _guards[host] = HostGuard(host)
+    return guard
+
+
+def guard_stats() -> Dict[str, Dict[str, object]]:
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {g.host: g.stats() for g in guards}
+
+
+def reset() -> None:
+    """
+    Forget every host (tests and load tests start each run clean).
+    """
+    with _guards_lock:
+        _guards.clear()
@@ -1,8 +1,8 @@
 import time
 import re
 from urllib.parse import urljoin
-import requests
 from bs4 import BeautifulSoup
+from .http_client import get_session
 from .models import ListingSummary, ListingDetail
 
 HEADERS = {
@@ -10,7 +10,7 @@ HEADERS = {
 }
 
 def fetch(url: str) -> BeautifulSoup:
-    resp = requests.get(url, headers=HEADERS, timeout=10)
+    resp = get_session().get(url, headers=HEADERS, timeout=10)
     resp.raise_for_status()
     return BeautifulSoup(resp.text, "html.parser")
 
@@ -95,8 +95,8 @@ def enrich_with_detail(summary: ListingSummary) -> ListingDetail:
     broker_link = soup.find("a", string=lambda s: s and "Läs mer hos mäklaren" in s)
     broker_website_url = broker_link["href"] if broker_link else None
 
-    return ListingDetail(
-        **summary.__dict__,
+    return ListingDetail.from_summary(
+        summary,
         broker_name=broker_name,
         broker_company=None,   # refine later
         broker_phone=None,
@@ -1,11 +1,15 @@
 # real_estate/scraper_detail.py
 
 import re
-from typing import Optional
-
-from bs4 import BeautifulSoup
-
-from .http_client import fetch_soup
+import sys
+from datetime import date, timedelta
+from typing import Any, Callable, Optional
+
+from .broker_cache import get_broker_cache
+from .extraction import Extractor, FieldSpec, LinkSpec
+from .html_parser import make_soup
+from .http_client import fetch_text
+from .metrics import timed
 from .models import ListingSummary, ListingDetail, Viewing
 
 # --- Regexes ---
@@ -17,9 +21,23 @@ PHONE_RE = re.compile(r"\b0\d[\d\s-]{7,}\d\b")  # rough Swedish mobile/landline
 # Example target text after get_text(" ", strip=True):
 # "7 dec Öppen visning, föranmäl dig gärna 13:30 – 14:00 ..."
 VIEWING_RE = re.compile(
-    r"(\d{1,2}\s+\w{3}.*?\d{2}:\d{2}\s*[–-]\s*\d{2}:\d{2}.*?visning)",
+    r"(\d{1,2})\s+(jan|feb|mar|apr|maj|jun|jul|aug|sep|okt|nov|dec)\w*\.?\s+"
+    r"([^\d]{0,80}?visning[^\d]{0,80}?)\s*"
+    r"(\d{1,2})[:.](\d{2})\s*[–-]\s*(\d{1,2})[:.](\d{2})",
     re.IGNORECASE,
 )
+MONTHS = ("jan", "feb", "mar", "apr", "maj", "jun", "jul", "aug", "sep", "okt", "nov", "dec")
+# first matching word in the viewing label -> Viewing.kind (else "other")
+VIEWING_KINDS = (
+    ("öppen", "open"),
+    ("privat", "private"),
+    ("bokad", "private"),
+    ("enskild", "private"),
+    ("digital", "digital"),
+    ("live", "digital"),
+)
+# a viewing date this far behind today is taken to be next year's
+VIEWING_PAST_DAYS = 60
 
 
 # --- Helpers ---
@@ -29,106 +47,152 @@ def _int_from_text(text: str) -> Optional[int]:
     return int(digits) if digits else None
 
 
-def _parse_viewings_from_booli(text: str) -> list[Viewing]:
+def parse_viewing(raw: str, today: Optional[date] = None) -> Viewing:
     """
-    Try to pull out 'visningar' such as:
-      7 dec Öppen visning, föranmäl dig gärna 13:30 – 14:00
-    For now we keep them as raw strings on Viewing.raw_text.
+    Split a viewing text into date (ISO, year guessed relative to `today`),
+    start/end ("HH:MM", local time) and kind (open/private/digital/other).
+    Text that doesn't match VIEWING_RE keeps only raw_text.
     """
-    viewings: list[Viewing] = []
-    for m in VIEWING_RE.finditer(text):
-        viewings.append(Viewing(raw_text=m.group(1).strip()))
-    return viewings
+    raw = raw.strip()
+    m = VIEWING_RE.match(raw)
+    if m is None:
+        return Viewing(raw_text=raw)
+    day, month, label, h1, m1, h2, m2 = m.groups()
+    on = _viewing_date(int(day), MONTHS.index(month.lower()) + 1, today or date.today())
+    lowered = label.lower()
+    kind = next((k for word, k in VIEWING_KINDS if word in lowered), "other")
+    return Viewing(
+        raw_text=raw,
+        date=on.isoformat() if on else None,
+        start=f"{int(h1):02d}:{m1}",
+        end=f"{int(h2):02d}:{m2}",
+        kind=kind,
+    )
+
+
+def _viewing_date(day: int, month: int, today: date) -> Optional[date]:
+    # Booli leaves the year out; viewings are (nearly) always upcoming
+    for year in (today.year, today.year + 1):
+        try:
+            on = date(year, month, day)
+        except ValueError:  # 29 feb
+            continue
+        if on >= today - timedelta(days=VIEWING_PAST_DAYS):
+            return on
+    return None
+
+
+def _single_space(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _interned(text: str) -> str:
+    return sys.intern(text.strip())
+
+
+# --- Extraction specs ---
+# Field names match ListingDetail attributes.
+
+BOOLI_DETAIL = Extractor(
+    fields=[
+        FieldSpec("drift_cost_sek", r"Driftskostnaden är\s+([\d\s]+)\s*kr/mån", _int_from_text),
+        FieldSpec("floor_of", r"Den ligger på våning\s+(\d+\s+av\s+\d+)"),
+        FieldSpec("days_on_booli", r"varit till salu i\s+(\d+)\s+dagar", int),
+        FieldSpec("booli_views", r"har\s+([\d\s]+)\s+sidvisningar på Booli", _int_from_text),
+        FieldSpec("ownership_type", r"Den här lägenheten är en\s+([^.]+)\.", _interned),
+        FieldSpec("building_year", r"Byggår\s+(\d{4})", int),
+        FieldSpec(
+            "viewings",
+            VIEWING_RE.pattern,
+            parse_viewing,
+            group=0,
+            many=True,
+            flags=VIEWING_RE.flags,
+        ),
+    ],
+    links=[LinkSpec("broker_website_url", "Läs mer hos mäklaren")],
+)
+
+# "Ansvarig mäklare\nAnders Ångström\nFastighetsmäklare\n..."
+SVENSKFAST_BROKER = Extractor(
+    fields=[
+        FieldSpec("broker_name", r"Ansvarig mäklare\s+([^\n]+)\s+Fastighetsmäklare"),
+        FieldSpec("broker_phone", PHONE_RE.pattern, _single_space, group=0),
+        FieldSpec("broker_email", EMAIL_RE.pattern, group=0),
+    ]
+)
+
+
+BrokerInfo = tuple[Optional[str], Optional[str], Optional[str]]
 
 
-def _fetch_broker_from_svenskfast(
-    url: str,
-) -> tuple[Optional[str], Optional[str], Optional[str]]:
+def _fetch_broker_from_svenskfast(url: str) -> BrokerInfo:
     """
     Go to Svensk Fastighetsförmedling object page and grab:
       - broker_name
       - broker_phone
       - broker_email
+    Answers come from the broker cache when we've seen `url` recently.
     """
     try:
-        soup = fetch_soup(url)
+        return get_broker_cache().get(url, _scrape_svenskfast_broker)
     except Exception:
         return None, None, None
 
-    text = soup.get_text("\n", strip=True)
-
-    broker_name: Optional[str] = None
-    broker_phone: Optional[str] = None
-    broker_email: Optional[str] = None
 
-    # Name is usually just after "Ansvarig mäklare"
-    # "Ansvarig mäklare\nAnders Ångström\nFastighetsmäklare\n..."
-    name_match = re.search(
-        r"Ansvarig mäklare\s+([^\n]+)\s+Fastighetsmäklare", text
-    )
-    if name_match:
-        broker_name = name_match.group(1).strip()
+def _scrape_svenskfast_broker(url: str) -> BrokerInfo:
+    """
+    Download and parse the broker page; raises if it can't be fetched.
+    """
+    return parse_svenskfast_broker(fetch_text(url))
 
-    # First phone number on the page
-    phone_match = PHONE_RE.search(text)
-    if phone_match:
-        broker_phone = re.sub(r"\s+", " ", phone_match.group(0)).strip()
 
-    # First email on the page
-    email_match = EMAIL_RE.search(text)
-    if email_match:
-        broker_email = email_match.group(0).strip()
+def parse_svenskfast_broker(html: str) -> BrokerInfo:
+    """
+    (name, phone, email) from a Svenskfast object page. No network.
+    """
+    soup = make_soup(html)
+    text = soup.get_text("\n", strip=True)
 
-    return broker_name, broker_phone, broker_email
+    # first name / phone / email on the page
+    with timed("extract", page="svenskfast_broker"):
+        found = SVENSKFAST_BROKER.extract(text)
+    return (
+        found.get("broker_name"),
+        found.get("broker_phone"),
+        found.get("broker_email"),
+    )
 
 
 # --- Main enrichment ---
 
-def enrich_with_detail(summary: ListingSummary) -> ListingDetail:
+def parse_booli_detail(html: str) -> dict[str, Any]:
     """
-    Take a ListingSummary from the Booli list page and enrich it with:
-      - drift cost, days on Booli, views, ownership type, building year
-      - viewings (visningar) parsed from the Booli text
-      - broker info fetched via 'Läs mer hos mäklaren' → Svenskfast page
+    The BOOLI_DETAIL fields (plus broker_website_url) of a Booli listing
+    page. No network: the pipeline runs this in worker processes.
     """
-    soup = fetch_soup(summary.url)
+    soup = make_soup(html)
     text = soup.get_text(" ", strip=True)
 
-    # --- Booli text-based details ---
-
-    drift_cost: Optional[int] = None
-    m = re.search(r"Driftskostnaden är\s+([\d\s]+)\s*kr/mån", text)
-    if m:
-        drift_cost = _int_from_text(m.group(1))
-
-    floor_of: Optional[str] = None
-    m = re.search(r"Den ligger på våning\s+(\d+\s+av\s+\d+)", text)
-    if m:
-        floor_of = m.group(1).strip()
-
-    days_on_booli: Optional[int] = None
-    m = re.search(r"varit till salu i\s+(\d+)\s+dagar", text)
-    if m:
-        days_on_booli = int(m.group(1))
-
-    views: Optional[int] = None
-    m = re.search(r"har\s+([\d\s]+)\s+sidvisningar på Booli", text)
-    if m:
-        views = _int_from_text(m.group(1))
-
-    ownership_type: Optional[str] = None
-    m = re.search(r"Den här lägenheten är en\s+([^.]+)\.", text)
-    if m:
-        ownership_type = m.group(1).strip()
+    # --- Booli text-based details + visningar, in one pass ---
 
-    building_year: Optional[int] = None
-    m = re.search(r"Byggår\s+(\d{4})", text)
-    if m:
-        building_year = int(m.group(1))
+    with timed("extract", page="booli_detail"):
+        found = BOOLI_DETAIL.extract(text)
+        found.update(BOOLI_DETAIL.extract_links(soup, text))
+    return found
 
-    # --- Visningar (viewings / open house) from Booli text ---
 
-    viewings = _parse_viewings_from_booli(text)
+def build_detail(
+    summary: ListingSummary,
+    found: dict[str, Any],
+    broker_lookup: Callable[[str], BrokerInfo] = _fetch_broker_from_svenskfast,
+) -> ListingDetail:
+    """
+    ListingDetail from a summary and parse_booli_detail()'s fields, with
+    broker info looked up via `broker_lookup` (a Svenskfast page URL ->
+    (name, phone, email), never raising).
+    """
+    found = dict(found)
 
     # --- Broker info via Booli + external page ---
 
@@ -136,18 +200,13 @@ def enrich_with_detail(summary: ListingSummary) -> ListingDetail:
     broker_company: Optional[str] = None
     broker_email: Optional[str] = None
     broker_phone: Optional[str] = None
-    broker_website_url: Optional[str] = None
 
-    # 1) Find "Läs mer hos mäklaren" link on Booli listing page
-    for a in soup.find_all("a", href=True):
-        link_text = a.get_text(" ", strip=True)
-        if "Läs mer hos mäklaren" in link_text:
-            broker_website_url = a["href"]
-            break
+    # 1) "Läs mer hos mäklaren" link on Booli listing page
+    broker_website_url: Optional[str] = found.pop("broker_website_url", None)
 
     # 2) If it's Svenskfast, fetch broker info there
     if broker_website_url and "svenskfast.se" in broker_website_url:
-        b_name, b_phone, b_email = _fetch_broker_from_svenskfast(broker_website_url)
+        b_name, b_phone, b_email = broker_lookup(broker_website_url)
         if b_name:
             broker_name = b_name
         if b_phone:
@@ -158,19 +217,22 @@ def enrich_with_detail(summary: ListingSummary) -> ListingDetail:
 
     # --- Build final ListingDetail ---
 
-    return ListingDetail(
-        **summary.__dict__,
-        drift_cost_sek=drift_cost,
-        floor_of=floor_of,
-        days_on_booli=days_on_booli,
-        booli_views=views,
-        ownership_type=ownership_type,
-        building_year=building_year,
+    return ListingDetail.from_summary(
+        summary,
+        **found,
         broker_name=broker_name,
         broker_company=broker_company,
         broker_email=broker_email,
         broker_phone=broker_phone,
         broker_website_url=broker_website_url,
-        viewings=viewings,
     )
 
+
+def enrich_with_detail(summary: ListingSummary) -> ListingDetail:
+    """
+    Take a ListingSummary from the Booli list page and enrich it with:
+      - drift cost, days on Booli, views, ownership type, building year
+      - viewings (visningar) parsed from the Booli text
+      - broker info fetched via 'Läs mer hos mäklaren' → Svenskfast page
+    """
+    return build_detail(summary, parse_booli_detail(fetch_text(summary.url)))
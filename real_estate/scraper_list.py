@@ -1,12 +1,17 @@
 # real_estate/scraper_list.py
 
 import re
-from urllib.parse import urljoin
-from typing import List
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from typing import Dict, Generator, Iterable, Iterator, List, Mapping, Optional, Set
 
-from bs4 import BeautifulSoup
-
-from .http_client import fetch_soup
+from .config import MAX_SEARCH_PAGES, MAX_SEARCH_RESULTS
+from .html_parser import LIST_CARDS, Document, make_soup
+from .http_client import fetch_soup, fetch_text
+from .metrics import observe
 from .models import ListingSummary
 
 
@@ -48,26 +53,26 @@ def parse_rooms(text: str) -> float:
     return float(m.group(1).replace(",", "."))
 
 
-def parse_list_page(search_url: str) -> List[ListingSummary]:
+def parse_cards(soup: Document, page_url: str) -> Iterator[ListingSummary]:
     """
-    Parse the Booli search page and return a list of ListingSummary objects.
+    Yield a ListingSummary per listing card of a parsed Booli search page,
+    as soon as each card is parsed.
     Uses the card container + sub-elements instead of h3.next_siblings.
     """
-    soup = fetch_soup(search_url)
-    results: List[ListingSummary] = []
-
     # Each listing card has this content container (from your screenshots).
     # We anchor on that as "one listing".
     cards = soup.select("div.object-card-layout__content")
 
     for card in cards:
+        started = time.perf_counter()
+
         # --- Address + URL ---
         header_link = card.select_one("h3 a[href*='/annons/']")
         if not header_link:
             continue
 
         address = header_link.get_text(strip=True)
-        url = urljoin(search_url, header_link["href"])
+        url = urljoin(page_url, header_link["href"])
 
         # Booli ID from /annons/<id>
         id_match = BOOLI_ID_RE.search(url)
@@ -116,7 +121,7 @@ def parse_list_page(search_url: str) -> List[ListingSummary]:
         # --- Status text (days on Booli / incoming / soon) ---
         full_text = card.get_text(" ", strip=True)
         status_match = STATUS_RE.search(full_text)
-        status_text = status_match.group(0) if status_match else ""
+        status_text = sys.intern(status_match.group(0)) if status_match else ""
 
         # --- Flags: Hiss / Balkong / Uteplats ---
         has_elevator = "Hiss" in full_text
@@ -127,8 +132,8 @@ def parse_list_page(search_url: str) -> List[ListingSummary]:
             booli_id=booli_id,
             url=url,
             address=address,
-            area=area,
-            city=city,
+            area=sys.intern(area),
+            city=sys.intern(city),
             price_sek=price_sek,
             living_area_m2=living_area_m2,
             rooms=rooms,
@@ -139,7 +144,151 @@ def parse_list_page(search_url: str) -> List[ListingSummary]:
             has_outdoor_space=has_outdoor_space,
             status_text=status_text,
         )
-        results.append(summary)
+        observe("extract", 1000 * (time.perf_counter() - started), page="list_card")
+        yield summary
+
+
+def parse_list_page(search_url: str) -> List[ListingSummary]:
+    """
+    Parse the first Booli search page and return a list of ListingSummary
+    objects. See iter_search for all pages.
+    """
+    # only the listing cards get built into a tree
+    soup = fetch_soup(search_url, parse_only=LIST_CARDS)
+    return list(parse_cards(soup, search_url))
+
+
+def page_url(search_url: str, page: int) -> str:
+    """
+    URL of result page `page` (1-based) of a Booli search.
+    Page 1 is the search URL itself.
+    """
+    if page <= 1:
+        return search_url
+    parts = urlsplit(search_url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "page"]
+    query.append(("page", str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query, safe=",")))
+
 
-    return results
+def iter_search(
+    search_url: str,
+    max_pages: Optional[int] = MAX_SEARCH_PAGES,
+    max_results: Optional[int] = MAX_SEARCH_RESULTS,
+) -> Generator[ListingSummary, None, bool]:
+    """
+    Crawl a Booli search page by page and yield each listing as soon as its
+    card is parsed, so callers can filter/enrich while we keep crawling.
+    Page N+1 is downloaded in the background while page N is parsed.
+
+    Stops at `max_pages` / `max_results` (None = no limit), on a page with
+    no listings we haven't already yielded, or after a short page.
+    Returns True only in the last two cases (we saw the whole result
+    list); False if a limit or a failed page after the first cut it short,
+    or if the first page has no listings at all.
+    """
+    seen: Set[int] = set()
+    first_page_size = 0
+    page = 1
+    prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-prefetch")
+    try:
+        pending: Optional[Future] = prefetch.submit(fetch_text, page_url(search_url, 1))
+        while pending is not None:
+            try:
+                html = pending.result()
+            except Exception as exc:
+                if page == 1:
+                    raise
+                # keep what we have rather than losing the whole crawl
+                print(f"[WARN] stopping search crawl at page {page}: {exc}", file=sys.stderr)
+                return False
+            pending = None
+            if max_pages is None or page < max_pages:
+                pending = prefetch.submit(fetch_text, page_url(search_url, page + 1))
+
+            url = page_url(search_url, page)
+            cards = 0
+            new = 0
+            for summary in parse_cards(make_soup(html, parse_only=LIST_CARDS), url):
+                cards += 1
+                if summary.booli_id in seen:
+                    continue
+                seen.add(summary.booli_id)
+                new += 1
+                yield summary
+                if max_results is not None and len(seen) >= max_results:
+                    return False
+
+            if page == 1:
+                if cards == 0:
+                    # a bot challenge, consent wall or new markup, not
+                    # proof that the search is empty
+                    print(f"[WARN] no listings on the first page of {search_url}", file=sys.stderr)
+                    return False
+                first_page_size = cards
+            if new == 0 or cards < first_page_size:
+                return True  # past the last page
+            page += 1
+        return False  # max_pages
+    finally:
+        # also runs when the caller stops iterating early
+        prefetch.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass
+class SearchCoverage:
+    """
+    What a crawl of several searches saw, filled in by iter_searches():
+    every booli_id any search returned (before filtering) and the names
+    of the searches crawled to their last page.
+    """
+
+    returned: Set[int] = field(default_factory=set)
+    complete: Set[str] = field(default_factory=set)
+
+    def gone(self, booli_id: int, searches: Iterable[str]) -> bool:
+        """
+        True if a listing found by `searches` is known to be off the
+        market: no search returned it, and every one of its searches was
+        crawled completely. Otherwise it may just not have been reached.
+        """
+        return booli_id not in self.returned and all(name in self.complete for name in searches)
 
+
+def iter_searches(
+    searches: Mapping[str, str],
+    max_pages: Optional[int] = MAX_SEARCH_PAGES,
+    max_results: Optional[int] = MAX_SEARCH_RESULTS,
+    coverage: Optional[SearchCoverage] = None,
+) -> Iterator[ListingSummary]:
+    """
+    Crawl several named searches (name -> search URL) and yield each
+    booli_id once. When a later search finds a listing again, its name is
+    added to the already-yielded summary's `searches` list instead.
+    A search that fails is reported and skipped; pass a `coverage` to
+    learn which searches were crawled completely.
+    """
+    if coverage is None:
+        coverage = SearchCoverage()
+    by_id: Dict[int, ListingSummary] = {}
+    for name, url in searches.items():
+        try:
+            search = iter_search(url, max_pages=max_pages, max_results=max_results)
+            while True:
+                try:
+                    summary = next(search)
+                except StopIteration as done:
+                    if done.value:
+                        coverage.complete.add(name)
+                    break
+                coverage.returned.add(summary.booli_id)
+                known = by_id.get(summary.booli_id)
+                if known is not None:
+                    if name not in known.searches:
+                        known.searches.append(name)
+                    continue
+                summary.searches = [name]
+                by_id[summary.booli_id] = summary
+                yield summary
+        except Exception as exc:
+            print(f"[WARN] search {name!r} failed: {exc}", file=sys.stderr)
@@ -1,51 +1,159 @@
 # real_estate/storage.py
 
 import json
+import os
+from contextlib import contextmanager
 from dataclasses import asdict
 from pathlib import Path
-from typing import Iterable, List, Set
+from typing import IO, Iterable, Iterator, List, Optional, Set
 
-from .models import ListingDetail
+from .config import STORAGE_BACKEND
+from .metrics import timed
+from .models import ListingDetail, intern_fields
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
-DATA_DIR.mkdir(exist_ok=True)
+DATA_DIR = BASE_DIR / "data"  # created on first write, not on import
 
 LISTINGS_PATH = DATA_DIR / "latest_listings.json"
+LISTINGS_JSONL_PATH = DATA_DIR / "latest_listings.jsonl"
 SEEN_IDS_PATH = DATA_DIR / "seen_ids.json"
 
 
+@contextmanager
+def _atomic_write(path: Path) -> Iterator[IO[str]]:
+    """
+    Write to a temp file next to `path` and rename it over `path` at the
+    end, so readers (the website) only ever see a complete file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _listing_from_dict(item: dict) -> ListingDetail:
+    from .models import Viewing  # avoid circular imports at top
+
+    if item.get("viewings"):
+        item["viewings"] = [Viewing(**v) for v in item["viewings"]]
+    return ListingDetail(**intern_fields(item))
+
+
+def listing_to_json(listing: ListingDetail) -> str:
+    """
+    One listing as compact JSON (the jsonl line format, minus the newline).
+    """
+    return json.dumps(asdict(listing), ensure_ascii=False, separators=(",", ":"))
+
+
 def save_listings(listings: Iterable[ListingDetail]) -> None:
     """
     Save all current listings to JSON.
+    With STORAGE_BACKEND = "jsonl" they're streamed one compact object per
+    line, so memory stays flat however many listings there are.
     """
+    with timed("storage_save", backend=STORAGE_BACKEND):
+        _save_listings(listings)
+
+
+def _save_listings(listings: Iterable[ListingDetail]) -> None:
+    if STORAGE_BACKEND == "sqlite":
+        from . import storage_sqlite
+
+        return storage_sqlite.save_listings(listings)
+
+    if STORAGE_BACKEND == "jsonl":
+        with _atomic_write(LISTINGS_JSONL_PATH) as f:
+            for l in listings:
+                f.write(listing_to_json(l))
+                f.write("\n")
+        return
+
     data = [asdict(l) for l in listings]
-    with LISTINGS_PATH.open("w", encoding="utf-8") as f:
+    with _atomic_write(LISTINGS_PATH) as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
 
-def load_listings() -> List[ListingDetail]:
+def iter_listings() -> Iterator[ListingDetail]:
     """
-    Load listings from JSON (if the file exists).
+    Yield stored listings one at a time. For "jsonl" this reads line by
+    line, so stopping early never touches the rest of the file.
     """
-    if not LISTINGS_PATH.exists():
-        return []
+    if STORAGE_BACKEND == "sqlite":
+        from . import storage_sqlite
+
+        yield from storage_sqlite.load_listings()
+        return
 
-    from .models import ListingDetail  # avoid circular imports at top
+    if STORAGE_BACKEND == "jsonl":
+        if not LISTINGS_JSONL_PATH.exists():
+            return
+        with LISTINGS_JSONL_PATH.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield _listing_from_dict(json.loads(line))
+        return
 
+    if not LISTINGS_PATH.exists():
+        return
+
+    # the pretty-printed file is one JSON document: it has to be read whole
     with LISTINGS_PATH.open("r", encoding="utf-8") as f:
         raw = json.load(f)
-
-    listings: List[ListingDetail] = []
     for item in raw:
-        listings.append(ListingDetail(**item))
-    return listings
+        yield _listing_from_dict(item)
+
+
+def load_listings() -> List[ListingDetail]:
+    """
+    Load listings from JSON (if the file exists).
+    """
+    with timed("storage_load", backend=STORAGE_BACKEND):
+        return list(iter_listings())
+
+
+def load_listing(booli_id: int) -> Optional[ListingDetail]:
+    """
+    Load a single stored listing by booli_id (None if we don't have it).
+    """
+    if STORAGE_BACKEND == "sqlite":
+        from . import storage_sqlite
+
+        return storage_sqlite.load_listing(booli_id)
+
+    if STORAGE_BACKEND == "jsonl":
+        if not LISTINGS_JSONL_PATH.exists():
+            return None
+        # booli_id is the first key on every line: skip other lines unparsed
+        prefix = f'{{"booli_id":{int(booli_id)},'
+        with LISTINGS_JSONL_PATH.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(prefix):
+                    return _listing_from_dict(json.loads(line))
+        return None
+
+    for listing in iter_listings():
+        if listing.booli_id == booli_id:
+            return listing
+    return None
 
 
 def load_seen_ids() -> Set[int]:
     """
     Load set of booli_id that we've seen before.
     """
+    if STORAGE_BACKEND == "sqlite":
+        from . import storage_sqlite
+
+        return storage_sqlite.load_seen_ids()
+
     if not SEEN_IDS_PATH.exists():
         return set()
 
@@ -58,6 +166,11 @@ def save_seen_ids(ids: Iterable[int]) -> None:
     """
     Save set of booli_id we've seen.
     """
+    if STORAGE_BACKEND == "sqlite":
+        from . import storage_sqlite
+
+        return storage_sqlite.save_seen_ids(ids)
+
     unique_ids = sorted(set(int(x) for x in ids))
-    with SEEN_IDS_PATH.open("w", encoding="utf-8") as f:
+    with _atomic_write(SEEN_IDS_PATH) as f:
         json.dump(unique_ids, f, ensure_ascii=False, indent=2)
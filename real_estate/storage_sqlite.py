@@ -0,0 +1,235 @@
+# real_estate/storage_sqlite.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+from dataclasses import fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union, get_args, get_origin, get_type_hints
+
+from .models import ListingDetail, Viewing, intern_fields
+from .storage import DATA_DIR
+
+DB_PATH = DATA_DIR / "listings.sqlite3"
+
+_SQL_TYPES = {int: "INTEGER", float: "REAL", bool: "INTEGER", str: "TEXT"}
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _columns(cls, skip: Tuple[str, ...] = ()) -> List[Tuple[str, str, Callable[[Any], Any], Callable[[Any], Any]]]:
+    """
+    (name, SQL type, from-db converter, to-db converter) for every field of
+    a dataclass, derived from its annotations so the schema follows
+    models.py. List fields are stored as JSON text.
+    """
+    hints = get_type_hints(cls)
+    cols = []
+    for f in fields(cls):
+        if f.name in skip:
+            continue
+        tp = hints[f.name]
+        if get_origin(tp) is Union:  # Optional[X]
+            tp = next(a for a in get_args(tp) if a is not type(None))
+        if get_origin(tp) is list:
+            cols.append((f.name, "TEXT", json.loads, lambda v: json.dumps(v, ensure_ascii=False)))
+            continue
+        sql_type = _SQL_TYPES.get(tp, "TEXT")
+        from_db = bool if tp is bool else _identity
+        cols.append((f.name, sql_type, from_db, _identity))
+    return cols
+
+
+LISTING_COLUMNS = _columns(ListingDetail, skip=("viewings",))
+VIEWING_COLUMNS = _columns(Viewing)
+
+_LISTING_NAMES = [c[0] for c in LISTING_COLUMNS]
+_VIEWING_NAMES = [c[0] for c in VIEWING_COLUMNS]
+
+_schema_ready: Set[str] = set()
+_schema_lock = threading.Lock()
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    key = str(DB_PATH)
+    if key in _schema_ready:
+        return
+    with _schema_lock:
+        listing_cols = ", ".join(f"{n} {t}" for n, t, _, _ in LISTING_COLUMNS if n != "booli_id")
+        viewing_cols = ", ".join(f"{n} {t}" for n, t, _, _ in VIEWING_COLUMNS)
+        conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS listings (
+                booli_id INTEGER PRIMARY KEY,
+                {listing_cols},
+                row_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS viewings (
+                booli_id INTEGER NOT NULL REFERENCES listings(booli_id) ON DELETE CASCADE,
+                position INTEGER NOT NULL,
+                {viewing_cols},
+                PRIMARY KEY (booli_id, position)
+            );
+            CREATE TABLE IF NOT EXISTS seen_ids (
+                booli_id INTEGER PRIMARY KEY
+            );
+            CREATE INDEX IF NOT EXISTS listings_area ON listings(area);
+            CREATE INDEX IF NOT EXISTS listings_price ON listings(price_sek);
+            """
+        )
+        # models.py grew a field since the table was created: add the column
+        for table, cols in (("listings", LISTING_COLUMNS), ("viewings", VIEWING_COLUMNS)):
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for name, sql_type, _, _ in cols:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+        conn.commit()
+        _schema_ready.add(key)
+
+
+def connect() -> sqlite3.Connection:
+    """
+    Open the listings database in WAL mode: readers (the website) keep
+    working while a scrape writes.
+    """
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    _ensure_schema(conn)
+    return conn
+
+
+def _to_db(column, value: Any) -> Any:
+    return None if value is None else column[3](value)
+
+
+def _from_db(column, value: Any) -> Any:
+    return None if value is None else column[2](value)
+
+
+def _row(listing: ListingDetail) -> Tuple[list, List[list], str]:
+    values = [_to_db(c, getattr(listing, c[0])) for c in LISTING_COLUMNS]
+    viewings = [[_to_db(c, getattr(v, c[0])) for c in VIEWING_COLUMNS] for v in (listing.viewings or [])]
+    row_hash = hashlib.sha1(repr((values, viewings)).encode("utf-8")).hexdigest()
+    return values, viewings, row_hash
+
+
+def save_listings(listings: Iterable[ListingDetail]) -> None:
+    """
+    Make the listings table hold exactly `listings`, touching only rows
+    that were added, changed or removed - all in one transaction.
+    """
+    rows: Dict[int, Tuple[list, List[list], str]] = {}
+    for listing in listings:
+        rows[listing.booli_id] = _row(listing)
+
+    conn = connect()
+    try:
+        with conn:
+            stored = dict(conn.execute("SELECT booli_id, row_hash FROM listings"))
+            changed = [i for i, r in rows.items() if stored.get(i) != r[2]]
+            removed = [(i,) for i in stored if i not in rows]
+
+            placeholders = ", ".join("?" for _ in _LISTING_NAMES)
+            updates = ", ".join(f"{n} = excluded.{n}" for n in _LISTING_NAMES if n != "booli_id")
+            conn.executemany(
+                f"INSERT INTO listings ({', '.join(_LISTING_NAMES)}, row_hash) "
+                f"VALUES ({placeholders}, ?) "
+                f"ON CONFLICT(booli_id) DO UPDATE SET {updates}, row_hash = excluded.row_hash",
+                [rows[i][0] + [rows[i][2]] for i in changed],
+            )
+            conn.executemany("DELETE FROM viewings WHERE booli_id = ?", [(i,) for i in changed])
+            conn.executemany(
+                f"INSERT INTO viewings (booli_id, position, {', '.join(_VIEWING_NAMES)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in _VIEWING_NAMES)})",
+                [
+                    [i, pos] + v
+                    for i in changed
+                    for pos, v in enumerate(rows[i][1])
+                ],
+            )
+            conn.executemany("DELETE FROM listings WHERE booli_id = ?", removed)
+    finally:
+        conn.close()
+
+
+def _build(conn: sqlite3.Connection, rows: List[tuple]) -> List[ListingDetail]:
+    if not rows:
+        return []
+    ids = [r[0] for r in rows]
+    viewings: Dict[int, List[Viewing]] = {}
+    # chunked to stay under SQLite's bound-parameter limit
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        for vrow in conn.execute(
+            f"SELECT booli_id, {', '.join(_VIEWING_NAMES)} FROM viewings "
+            f"WHERE booli_id IN ({', '.join('?' for _ in chunk)}) ORDER BY booli_id, position",
+            chunk,
+        ):
+            values = {c[0]: _from_db(c, v) for c, v in zip(VIEWING_COLUMNS, vrow[1:])}
+            viewings.setdefault(vrow[0], []).append(Viewing(**values))
+
+    listings = []
+    for row in rows:
+        values = {c[0]: _from_db(c, v) for c, v in zip(LISTING_COLUMNS, row)}
+        values["viewings"] = viewings.get(row[0], [])
+        listings.append(ListingDetail(**intern_fields(values)))
+    return listings
+
+
+def load_listings() -> List[ListingDetail]:
+    if not DB_PATH.exists():
+        return []  # reading shouldn't create the database
+    conn = connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(_LISTING_NAMES)} FROM listings ORDER BY rowid"
+        ).fetchall()
+        return _build(conn, rows)
+    finally:
+        conn.close()
+
+
+def load_listing(booli_id: int) -> Optional[ListingDetail]:
+    if not DB_PATH.exists():
+        return None
+    conn = connect()
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(_LISTING_NAMES)} FROM listings WHERE booli_id = ?",
+            (booli_id,),
+        ).fetchall()
+        found = _build(conn, rows)
+        return found[0] if found else None
+    finally:
+        conn.close()
+
+
+def load_seen_ids() -> Set[int]:
+    if not DB_PATH.exists():
+        return set()
+    conn = connect()
+    try:
+        return {row[0] for row in conn.execute("SELECT booli_id FROM seen_ids")}
+    finally:
+        conn.close()
+
+
+def save_seen_ids(ids: Iterable[int]) -> None:
+    """
+    Add `ids` to the seen set. IDs are never removed, so only new ones
+    cause a write.
+    """
+    conn = connect()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_ids (booli_id) VALUES (?)",
+                [(int(i),) for i in set(ids)],
+            )
+    finally:
+        conn.close()
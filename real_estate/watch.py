@@ -0,0 +1,163 @@
+# real_estate/watch.py
+
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Set
+
+from .config import (
+    SEARCHES,
+    WATCH_MIN_INTERVAL_SECONDS,
+    WATCH_MAX_INTERVAL_SECONDS,
+    WATCH_INITIAL_INTERVAL_SECONDS,
+    WATCH_JITTER,
+    WATCH_TARGET_CHANGES_PER_POLL,
+    WATCH_RATE_SMOOTHING,
+)
+from .changes import ChangeEvent
+from .controllers import collect_apartments, gone_predicate, persist
+from .models import ListingDetail
+from .scraper_list import SearchCoverage
+from .storage import load_listings, load_seen_ids
+
+
+@dataclass
+class SearchSchedule:
+    """
+    Poll state of one named search.
+    `rate` is the smoothed number of new/changed listings per second.
+    """
+
+    name: str
+    url: str
+    interval: float = WATCH_INITIAL_INTERVAL_SECONDS
+    next_run: float = 0.0
+    last_run: Optional[float] = None
+    rate: Optional[float] = None
+
+    def observe(self, changes: int, now: float) -> None:
+        """
+        Fold one poll's result into the rate and pick the next interval:
+        the time we expect WATCH_TARGET_CHANGES_PER_POLL changes to take.
+        """
+        elapsed = max(1.0, now - self.last_run) if self.last_run else self.interval
+        sample = changes / elapsed
+        if self.rate is None:
+            self.rate = sample
+        else:
+            self.rate = WATCH_RATE_SMOOTHING * sample + (1 - WATCH_RATE_SMOOTHING) * self.rate
+
+        if self.rate > 0:
+            interval = WATCH_TARGET_CHANGES_PER_POLL / self.rate
+        else:
+            interval = WATCH_MAX_INTERVAL_SECONDS
+        self.interval = min(WATCH_MAX_INTERVAL_SECONDS, max(WATCH_MIN_INTERVAL_SECONDS, interval))
+
+        jitter = 1 + random.uniform(-WATCH_JITTER, WATCH_JITTER)
+        self.last_run = now
+        self.next_run = now + self.interval * jitter
+
+
+class Watcher:
+    """
+    Keeps the listing set, seen IDs and (via http_client) the connection
+    pool and HTTP cache warm between cycles. Each cycle polls only the
+    searches that are due and reports listings we've never seen before.
+    """
+
+    def __init__(self, searches: Optional[Mapping[str, str]] = None):
+        searches = SEARCHES if searches is None else searches
+        self.schedules = [SearchSchedule(name, url) for name, url in searches.items()]
+        self.state: Dict[int, ListingDetail] = {d.booli_id: d for d in load_listings()}
+        self.seen: Set[int] = load_seen_ids()
+        self.cycles = 0
+        self.last_changes: List[ChangeEvent] = []
+
+    def due(self, now: float) -> List[SearchSchedule]:
+        return [s for s in self.schedules if s.next_run <= now]
+
+    def run_cycle(self, now: Optional[float] = None) -> List[ListingDetail]:
+        """
+        Poll the due searches, merge their listings into the state, persist,
+        reschedule, and return the listings that are NEW.
+        """
+        now = time.time() if now is None else now
+        due = self.due(now)
+        if not due:
+            return []
+        due_names = {s.name for s in due}
+
+        # Snapshot before collecting: reused listings are the same objects
+        # and get their `searches` rewritten by collect_apartments.
+        searched = {booli_id: list(d.searches or []) for booli_id, d in self.state.items()}
+        undue = {booli_id: [n for n in names if n not in due_names] for booli_id, names in searched.items()}
+        coverage = SearchCoverage()
+        found = collect_apartments({s.name: s.url for s in due}, self.state, coverage=coverage)
+        found_ids = set(map(id, found))
+        changed = [d for d in found if self.state.get(d.booli_id) is not d]
+
+        # A listing that no due search returned is gone - unless a search
+        # we didn't poll this cycle still has it. One that a search may just
+        # not have reached (didn't poll it, or didn't finish) is kept as is.
+        gone = gone_predicate(coverage, searched, [s.name for s in self.schedules])
+        merged: Dict[int, ListingDetail] = {}
+        unreached: Set[int] = set()
+        for booli_id, d in self.state.items():
+            if booli_id not in coverage.returned and not gone(booli_id):
+                merged[booli_id] = d
+                unreached.add(booli_id)
+            elif undue[booli_id]:
+                merged[booli_id] = d
+        for d in found:
+            merged[d.booli_id] = d
+        for booli_id, d in merged.items():
+            if booli_id in unreached:
+                continue
+            polled = d.searches if id(d) in found_ids else []
+            d.searches = sorted(set(polled or []) | set(undue.get(booli_id, [])))
+        self.state = merged
+
+        new = [d for d in found if d.booli_id not in self.seen]
+        self.last_changes = persist(list(self.state.values()), gone)
+        self.seen.update(d.booli_id for d in found)
+
+        finished = time.time()
+        for s in due:
+            s.observe(sum(1 for d in changed if s.name in (d.searches or [])), finished)
+        self.cycles += 1
+        return new
+
+    def run(
+        self,
+        emit: Callable[[ListingDetail], None],
+        log: Callable[[str], None] = print,
+        max_cycles: Optional[int] = None,
+        on_update: Optional[Callable[[List[ListingDetail]], None]] = None,
+    ) -> None:
+        """
+        Poll forever (or `max_cycles` times), calling `emit` for every NEW
+        listing and `on_update` with the full listing set after each cycle.
+        A failing cycle is logged and retried at the next due time.
+        """
+        while max_cycles is None or self.cycles < max_cycles:
+            now = time.time()
+            if not self.due(now):
+                time.sleep(max(0.0, min(s.next_run for s in self.schedules) - now))
+                continue
+            try:
+                new = self.run_cycle(now)
+            except Exception as exc:
+                log(f"[watch] cycle failed: {exc}")
+                for s in self.due(now):
+                    s.next_run = now + s.interval
+                self.cycles += 1
+                continue
+            for d in new:
+                emit(d)
+            if on_update is not None:
+                on_update(list(self.state.values()))
+            nxt = ", ".join(
+                f"{s.name} in {int(max(0, s.next_run - time.time()) // 60)} min" for s in self.schedules
+            )
+            moved = sum(1 for e in self.last_changes if e.kind != "new")
+            log(f"[watch] cycle {self.cycles}: {len(new)} new, {moved} other changes; next: {nxt}")